@@ -1,5 +1,6 @@
 """Base class para agentes."""
 
+import base64
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
@@ -41,8 +42,6 @@ class BaseAgent(ABC):
 
 def load_image_as_base64(image_path: Path) -> str:
     """Carga una imagen y la convierte a base64."""
-    import base64
-
     with open(image_path, "rb") as f:
         return base64.standard_b64encode(f.read()).decode("utf-8")
 
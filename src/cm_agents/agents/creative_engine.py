@@ -5,6 +5,7 @@ optimizado para generar múltiples prompts coherentes en una sola llamada.
 """
 
 import json
+import re
 from pathlib import Path
 
 import anthropic
@@ -18,6 +19,9 @@ from .base import BaseAgent, get_image_media_type, load_image_as_base64
 
 console = Console()
 
+# Salvages the JSON object from responses wrapped in prose or code fences.
+_JSON_BRACE_RE = re.compile(r"\{[\s\S]*\}")
+
 CREATIVE_ENGINE_SYSTEM_PROMPT = """Sos un director creativo experto en campañas de redes sociales con 15+ años de experiencia.
 
 ## Tu Rol
@@ -222,9 +226,7 @@ NEGATIVE PROMPTS (avoid these):
         try:
             data = json.loads(response_text)
         except json.JSONDecodeError:
-            import re
-
-            json_match = re.search(r"\{[\s\S]*\}", response_text)
+            json_match = _JSON_BRACE_RE.search(response_text)
             if json_match:
                 data = json.loads(json_match.group())
             else:
@@ -359,9 +361,7 @@ Respondé en JSON con: {{"prompt": "...", "negative_prompt": "...", "visual_note
         try:
             data = json.loads(response_text)
         except json.JSONDecodeError:
-            import re
-
-            json_match = re.search(r"\{[\s\S]*\}", response_text)
+            json_match = _JSON_BRACE_RE.search(response_text)
             if json_match:
                 data = json.loads(json_match.group())
             else:
@@ -2,11 +2,13 @@
 
 import asyncio
 import base64
+import io
 import uuid
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from openai import OpenAI
+from PIL import Image
 from rich.console import Console
 
 from ..models.brand import Brand
@@ -39,6 +41,20 @@ SIZE_MAPPINGS = {
     "1920x1080": "1536x1024",  # 16:9 horizontal
 }
 
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _save_png(image_bytes: bytes, image_path: Path) -> None:
+    """Guarda una imagen generada como PNG.
+
+    La API ya devuelve PNG: se escriben los bytes tal cual, sin decodificar y
+    recodificar (zlib). Solo otros formatos pasan por PIL.
+    """
+    if image_bytes.startswith(_PNG_SIGNATURE):
+        image_path.write_bytes(image_bytes)
+        return
+    Image.open(io.BytesIO(image_bytes)).save(image_path, "PNG")
+
 
 class GeneratorAgent(BaseAgent):
     """Agente que genera imágenes usando GPT-Image de OpenAI (Responses API)."""
@@ -130,12 +146,7 @@ class GeneratorAgent(BaseAgent):
             filename = f"{product.name}_v{variant_number}.png"
             image_path = output_dir / filename
 
-            import io
-
-            from PIL import Image
-
-            img = Image.open(io.BytesIO(image_bytes))
-            img.save(image_path, "PNG", quality=95)
+            _save_png(image_bytes, image_path)
 
             # Calcular costo
             cost = COST_PER_IMAGE.get(self.model, 0.05)
@@ -555,13 +566,7 @@ RECORDATORIO FINAL: El producto debe ser una COPIA EXACTA de la imagen del produ
             filename = f"{product.name}_v{variant_number}.png"
             image_path = output_dir / filename
 
-            import io
-
-            from PIL import Image
-
-            image_bytes = base64.b64decode(image_data[0])
-            img = Image.open(io.BytesIO(image_bytes))
-            img.save(image_path, "PNG", quality=95)
+            _save_png(base64.b64decode(image_data[0]), image_path)
 
             # Calcular costo
             cost = COST_PER_IMAGE.get(self.model, 0.05)
@@ -188,9 +188,10 @@ class StrategistAgent:
         self,
         model: str = "claude-sonnet-4-20250514",
         knowledge_dir: Path = Path("knowledge"),
+        knowledge: KnowledgeBase | None = None,
     ):
         self.model = model
-        self.knowledge = KnowledgeBase(knowledge_dir)
+        self.knowledge = knowledge if knowledge is not None else KnowledgeBase(knowledge_dir)
         self.client: Anthropic | None = None
 
     def _get_client(self) -> Anthropic | None:
@@ -3,6 +3,7 @@
 import asyncio
 import json
 import logging
+import os
 from pathlib import Path
 
 from fastapi import APIRouter, BackgroundTasks, HTTPException
@@ -18,11 +19,49 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+REFERENCE_EXTENSIONS = (".jpg", ".png", ".webp")
+
+
 def get_plans_dir() -> Path:
     """Get plans directory path."""
     return Path(settings.OUTPUTS_DIR) / "plans"
 
 
+def _reference_entries(refs_dir: Path) -> list[os.DirEntry]:
+    """Reference images in refs_dir, from a single directory read."""
+    try:
+        with os.scandir(refs_dir) as it:
+            return [
+                entry
+                for entry in it
+                if not entry.name.startswith(".")
+                and entry.name.endswith(REFERENCE_EXTENSIONS)
+                and entry.is_file()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _newest_reference(refs_dir: Path) -> Path | None:
+    """Most recently modified reference image (one stat per file, no sort)."""
+    entries = _reference_entries(refs_dir)
+    if not entries:
+        return None
+    return Path(max(entries, key=lambda entry: entry.stat().st_mtime).path)
+
+
+def _first_reference(refs_dir: Path) -> Path | None:
+    """First reference image, preferring .jpg over .png over .webp."""
+    entries = _reference_entries(refs_dir)
+    if not entries:
+        return None
+    first = min(
+        entries,
+        key=lambda entry: REFERENCE_EXTENSIONS.index(os.path.splitext(entry.name)[1]),
+    )
+    return Path(first.path)
+
+
 async def execute_generation(
     plan_id: str,
     item_ids: list[str] | None = None,
@@ -174,17 +213,9 @@ async def execute_generation(
                     # Try to find matching downloaded files by checking recent files
                     refs_dir = Path("references")
                     if refs_dir.exists():
-                        # Get most recent image files
-                        ref_files = sorted(
-                            list(refs_dir.glob("*.jpg"))
-                            + list(refs_dir.glob("*.png"))
-                            + list(refs_dir.glob("*.webp")),
-                            key=lambda p: p.stat().st_mtime,
-                            reverse=True,
-                        )
-                        # Use most recent file
-                        if ref_files:
-                            reference_path = ref_files[0]
+                        # Use most recent image file
+                        reference_path = _newest_reference(refs_dir)
+                        if reference_path:
                             logger.info(f"Using reference image (most recent): {reference_path}")
                         else:
                             logger.warning(
@@ -194,16 +225,9 @@ async def execute_generation(
                 # Fallback: use default reference from brand references or product photos
                 if not reference_path:
                     # Try brand references directory
-                    refs_dir = brand_dir / "references"
-                    if refs_dir.exists():
-                        ref_files = (
-                            list(refs_dir.glob("*.jpg"))
-                            + list(refs_dir.glob("*.png"))
-                            + list(refs_dir.glob("*.webp"))
-                        )
-                        if ref_files:
-                            reference_path = ref_files[0]
-                            logger.info(f"Using brand reference: {reference_path}")
+                    reference_path = _first_reference(brand_dir / "references")
+                    if reference_path:
+                        logger.info(f"Using brand reference: {reference_path}")
 
                 # If still no reference, use product photo
                 if not reference_path:
@@ -2,7 +2,11 @@
 
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
+import anthropic
+import httpx
+import openai
 from rich.console import Console
 from rich.panel import Panel
 
@@ -12,10 +16,23 @@ from .models.brand import Brand
 from .models.campaign_plan import CampaignPlan
 from .models.generation import GenerationPrompt, GenerationResult
 from .models.product import Product
+from .services.concurrency import map_bounded
 from .styles import build_visual_direction_from_style
 
 console = Console(force_terminal=True, legacy_windows=False)
 
+# Upstream failures worth retrying right away: the same request may succeed a
+# moment later (timeouts, dropped connections, rate limits, 5xx).
+TRANSIENT_ERRORS: tuple[type[Exception], ...] = (
+    httpx.TransportError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    anthropic.APIConnectionError,
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+)
+
 
 class GenerationPipeline:
     """Pipeline completo que conecta CreativeEngine + Generator."""
@@ -257,6 +274,49 @@ class GenerationPipeline:
 
         return results
 
+    def run_batch(
+        self,
+        reference_path: Path,
+        brand_dir: Path,
+        entries: list[dict[str, Any]],
+        max_concurrent: int = 5,
+        transient_retries: int = 1,
+    ) -> list[tuple[list[GenerationResult], str | None]]:
+        """
+        Ejecuta `run` para varios items en paralelo con la misma referencia y marca.
+
+        Cada generación espera a las APIs remotas (I/O), así que los items se
+        reparten en un pool de threads acotado por `max_concurrent`.
+
+        Args:
+            reference_path: Path a la imagen de ESTILO compartida por todos los items
+            brand_dir: Path al directorio de la marca
+            entries: kwargs de `run` por item (product_dir, target_sizes, headline, ...)
+            max_concurrent: Máximo de generaciones simultáneas
+            transient_retries: Reintentos inmediatos por item ante errores
+                transitorios (`TRANSIENT_ERRORS`), sin esperar al resto del batch
+
+        Returns:
+            Lista alineada con `entries` de (resultados, error); error es None si
+            el item se generó bien. Un item que falla no corta al resto.
+        """
+
+        def _run_one(entry: dict[str, Any]) -> tuple[list[GenerationResult], str | None]:
+            for attempt in range(transient_retries + 1):
+                try:
+                    results = self.run(reference_path=reference_path, brand_dir=brand_dir, **entry)
+                    return results, None
+                except TRANSIENT_ERRORS as e:
+                    if attempt < transient_retries:
+                        console.print(f"[yellow][!] Error transitorio, reintentando: {e}[/yellow]")
+                        continue
+                    return [], str(e)
+                except Exception as e:
+                    return [], str(e)
+            return [], "unknown_error"
+
+        return map_bounded(_run_one, entries, max_concurrent)
+
 
 class CampaignPipeline:
     """Pipeline optimizado para campañas - usa CreativeEngine + Generator batch.
@@ -411,6 +471,7 @@ class CampaignPipeline:
         product_scale: float | None = None,
         product_position: str | None = None,
         use_cascade: bool = True,
+        max_concurrent: int = 5,
     ) -> list[GenerationResult]:
         """
         Ejecuta campaña con INPAINTING - integración realista del producto.
@@ -434,6 +495,7 @@ class CampaignPipeline:
             product_scale: Escala del producto (0.3-0.5 recomendado)
             product_position: "center", "left", "right", "bottom-center"
             use_cascade: Si usar cascada de referencias para coherencia
+            max_concurrent: Máximo de imágenes generándose a la vez
 
         Returns:
             Lista de GenerationResult con imágenes finales
@@ -535,66 +597,73 @@ class CampaignPipeline:
         # 5. Generar imágenes con inpainting
         console.print("\n[bold]4. Generando imágenes con inpainting...[/bold]")
 
-        results: list[GenerationResult] = []
         product_list = list(product_photos.items())
-        total_cost = 0.0
 
-        for i, prompt in enumerate(prompts):
+        def _prepare(i: int, prompt) -> tuple[Product, str, dict[str, Any]]:
             # Seleccionar producto
             product_slug, photo_path = product_list[i % len(product_list)]
             product = products.get(product_slug, Product(name=product_slug, price=""))
 
-            console.print(f"\n[bold cyan]Imagen {i + 1}/{len(prompts)}[/bold cyan]")
-            console.print(f"[dim]   Producto: {product.name}[/dim]")
-
-            try:
-                # Preparar prompt con cascada si corresponde
-                scene_prompt = prompt.get_full_prompt()
-                if cascade_manager and i > 0:
-                    scene_prompt, _ = cascade_manager.prepare_cascaded_generation(
-                        scene_prompt, is_first=False
-                    )
-
-                # Generar con inpainting
-                filename = f"{product.name}_v{i + 1}.png"
-                output_path = output_dir / filename
-
-                final_path, cost = inpainter.generate_with_inpainting(
-                    scene_prompt=scene_prompt,
-                    product_photo=photo_path,
-                    product_description=product.visual_description
-                    or f"{product.name} - {product.description}",
-                    output_path=output_path,
-                    size="1024x1536",  # Formato vertical para social
-                    position=effective_position,
-                    product_scale=effective_scale,
+            # Preparar prompt con cascada si corresponde
+            scene_prompt = prompt.get_full_prompt()
+            if cascade_manager and i > 0:
+                scene_prompt, _ = cascade_manager.prepare_cascaded_generation(
+                    scene_prompt, is_first=False
                 )
 
-                total_cost += cost
-
-                # Actualizar cascada con la imagen generada
-                if cascade_manager and i == 0:
-                    cascade_manager.set_anchor(final_path)
-
-                # Crear resultado
-                import uuid
-
-                gen_result = GenerationResult(
-                    id=str(uuid.uuid4())[:8],
-                    image_path=final_path,
-                    prompt_used=scene_prompt,
-                    brand_name=brand.name,
-                    product_name=product.name,
-                    variant_number=i + 1,
-                    cost_usd=cost,
-                )
-                results.append(gen_result)
+            job = {
+                "scene_prompt": scene_prompt,
+                "product_photo": photo_path,
+                "product_description": product.visual_description
+                or f"{product.name} - {product.description}",
+                "output_path": output_dir / f"{product.name}_v{i + 1}.png",
+                "size": "1024x1536",  # Formato vertical para social
+                "position": effective_position,
+                "product_scale": effective_scale,
+            }
+            return product, scene_prompt, job
+
+        def _to_result(
+            i: int, product: Product, scene_prompt: str, outcome: tuple
+        ) -> GenerationResult | None:
+            final_path, cost, error = outcome
+            if error is not None:
+                console.print(f"[red][X] Error en imagen {i + 1}: {error}[/red]")
+                return None
+
+            # Crear resultado
+            import uuid
+
+            return GenerationResult(
+                id=str(uuid.uuid4())[:8],
+                image_path=final_path,
+                prompt_used=scene_prompt,
+                brand_name=brand.name,
+                product_name=product.name,
+                variant_number=i + 1,
+                cost_usd=cost,
+            )
 
-            except Exception as e:
-                console.print(f"[red][X] Error en imagen {i + 1}: {e}[/red]")
-                import traceback
+        # La primera imagen fija el anchor de la cascada; el resto se genera en paralelo
+        pending = list(enumerate(prompts))
+        generated: list[GenerationResult | None] = []
+        if cascade_manager and pending:
+            i, prompt = pending.pop(0)
+            product, scene_prompt, job = _prepare(i, prompt)
+            outcome = inpainter.generate_with_inpainting_batch([job])[0]
+            if outcome[2] is None:
+                cascade_manager.set_anchor(outcome[0])
+            generated.append(_to_result(i, product, scene_prompt, outcome))
+
+        prepared = [(i, *_prepare(i, prompt)) for i, prompt in pending]
+        outcomes = inpainter.generate_with_inpainting_batch(
+            [job for *_, job in prepared], max_concurrent=max_concurrent
+        )
+        for (i, product, scene_prompt, _), outcome in zip(prepared, outcomes):
+            generated.append(_to_result(i, product, scene_prompt, outcome))
 
-                traceback.print_exc()
+        results = [r for r in generated if r is not None]
+        total_cost = sum(r.cost_usd for r in results)
 
         # 6. Guardar metadatos
         console.print("\n[bold]5. Guardando metadatos...[/bold]")
@@ -626,6 +695,7 @@ class CampaignPipeline:
         style_refs: list[Path],
         output_dir: Path | None = None,
         use_cascade: bool = True,
+        max_concurrent: int = 5,
     ) -> list[GenerationResult]:
         """
         Ejecuta campaña usando DirectGenerator (Responses API).
@@ -643,6 +713,7 @@ class CampaignPipeline:
             style_refs: Referencias visuales de estilo
             output_dir: Directorio de salida
             use_cascade: Si usar coherencia visual entre días
+            max_concurrent: Máximo de días generándose a la vez
 
         Returns:
             Lista de GenerationResult con imágenes finales
@@ -703,10 +774,7 @@ class CampaignPipeline:
         # 5. Generar imágenes por día
         console.print("\n[bold]4. Generando imágenes...[/bold]")
 
-        results: list[GenerationResult] = []
-        total_cost = 0.0
-
-        for i, day_plan in enumerate(campaign_plan.days):
+        def _generate_day(i: int, day_plan) -> GenerationResult | None:
             console.print(f"\n[bold cyan]═══ Día {day_plan.day}: {day_plan.theme} ═══[/bold cyan]")
 
             # Determinar headline según el tema del día
@@ -746,8 +814,6 @@ class CampaignPipeline:
                     variant_number=i + 1,
                 )
 
-                total_cost += cost
-
                 # Si es el primer día, establecer como anchor para coherencia
                 if cascade_manager and i == 0:
                     cascade_manager.set_anchor(final_path)
@@ -765,13 +831,25 @@ class CampaignPipeline:
                     variant_number=i + 1,
                     cost_usd=cost,
                 )
-                results.append(gen_result)
+                return gen_result
 
             except Exception as e:
                 console.print(f"[red][X] Error en día {day_plan.day}: {e}[/red]")
                 import traceback
 
                 traceback.print_exc()
+                return None
+
+        # El día 1 fija el anchor de la cascada; el resto se genera en paralelo
+        days = list(enumerate(campaign_plan.days))
+        generated: list[GenerationResult | None] = []
+        if cascade_manager and days:
+            generated.append(_generate_day(*days[0]))
+            days = days[1:]
+        generated.extend(map_bounded(lambda item: _generate_day(*item), days, max_concurrent))
+
+        results = [r for r in generated if r is not None]
+        total_cost = sum(r.cost_usd for r in results)
 
         # 6. Resumen final
         console.print("\n")
@@ -801,6 +879,7 @@ class CampaignPipeline:
         product_name: str | None = None,
         size: str = "1024x1536",
         campaign_title: str | None = None,
+        max_concurrent: int = 5,
     ) -> list[GenerationResult]:
         """
         Campaña por referencias: 1 producto + 1 escena + 1 fuente.
@@ -819,6 +898,7 @@ class CampaignPipeline:
             product_name: Nombre del producto (default: stem de product_ref).
             size: Tamaño de imagen (ej. 1024x1536).
             campaign_title: Título de campaña para headlines (ej. "BLACK FRIDAY"). Si no se pasa y el plan es por defecto, se usa "PROMO".
+            max_concurrent: Máximo de días generándose a la vez.
 
         Returns:
             Lista de GenerationResult (una por día).
@@ -881,10 +961,8 @@ class CampaignPipeline:
         generator = get_direct_generator(model="gpt-image-1.5")
 
         console.print("\n[bold]Generando variaciones por día...[/bold]")
-        results: list[GenerationResult] = []
-        total_cost = 0.0
 
-        for i, day_plan in enumerate(campaign_plan.days):
+        def _generate_day(i: int, day_plan) -> GenerationResult | None:
             headline = self._get_headline_for_theme(day_plan.theme, campaign_plan.name)
             subheadline = self._get_subheadline_for_theme(day_plan.theme, day_plan.urgency_level)
             angle_hint = product_angles[i % len(product_angles)]
@@ -913,25 +991,29 @@ class CampaignPipeline:
                     font_ref=font_ref,
                 )
 
-                total_cost += cost_base + cost_overlay
                 import uuid
 
-                results.append(
-                    GenerationResult(
-                        id=str(uuid.uuid4())[:8],
-                        image_path=final_path,
-                        prompt_used=f"refs: {product_ref.name} + {scene_ref.name} + {font_ref.name} | angle: {angle_hint}",
-                        brand_name=brand.name,
-                        product_name=product.name,
-                        variant_number=day_plan.day,
-                        cost_usd=cost_base + cost_overlay,
-                    )
+                return GenerationResult(
+                    id=str(uuid.uuid4())[:8],
+                    image_path=final_path,
+                    prompt_used=f"refs: {product_ref.name} + {scene_ref.name} + {font_ref.name} | angle: {angle_hint}",
+                    brand_name=brand.name,
+                    product_name=product.name,
+                    variant_number=day_plan.day,
+                    cost_usd=cost_base + cost_overlay,
                 )
             except Exception as e:
                 console.print(f"[red][X] Error día {day_plan.day}: {e}[/red]")
                 import traceback
 
                 traceback.print_exc()
+                return None
+
+        # Los días son independientes entre sí (base -> texto sigue siendo secuencial por día)
+        days = list(enumerate(campaign_plan.days))
+        generated = map_bounded(lambda item: _generate_day(*item), days, max_concurrent)
+        results = [r for r in generated if r is not None]
+        total_cost = sum(r.cost_usd for r in results)
 
         for r in results:
             r.save_metadata()
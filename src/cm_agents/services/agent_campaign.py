@@ -7,21 +7,68 @@ from __future__ import annotations
 
 import json
 import os
-import re
-from dataclasses import asdict, dataclass, field
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from string import Template
 from typing import Any
 from uuid import uuid4
 
 import httpx
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
+
 from ..agents.strategist import KnowledgeBase, StrategistAgent
 from ..models.brand import Brand
 from ..models.product import Product
-from ..pipeline import GenerationPipeline
 from ..styles import build_visual_direction_from_style
 
+# Orchestration prompts are compiled once at import; each call only substitutes values.
+_WORKER_PLAN_PROMPT = Template(
+    "Decide which workers to run for this campaign request. Return ONLY strict JSON.\n"
+    "Hard constraints:\n"
+    "- If build=false: generate=false and qa=false\n"
+    "- If include_text=false: copy=false\n"
+    "- If build=true: generate must be true\n"
+    "Policy guidance:\n"
+    "- Run research if user asks for trends/inspiration OR if there is no style ref input and no brand references\n"
+    "- Run copy only if include_text=true\n"
+    "- Run design if build=true\n"
+    "- Run qa if build=true and max_retries>0\n\n"
+    "brand=$brand_slug\n"
+    "products=$product_slugs\n"
+    "objective=$objective\n"
+    "days=$days\n"
+    "build=$build\n"
+    "include_text=$include_text\n"
+    "max_retries=$max_retries\n"
+    "has_style_ref_input=$has_style_ref_input\n"
+    "has_brand_style_ref=$has_brand_style_ref\n"
+    "allowed_workers=$allowed_workers\n"
+    'JSON schema: {"workers": [{"name":"research","run":true,"reason":"...","params":{}}], "reason":"..."}'
+)
+
+_TRANSLATE_PROMPT = Template(
+    "Convert the user request into execution params for campaign workers. Return ONLY strict JSON.\n"
+    "brand=$brand_slug\n"
+    "available_products=$available_products\n"
+    "user_request=$user_request\n"
+    "Rules:\n"
+    "- days must be integer between 1 and 14\n"
+    "- build is boolean\n"
+    "- include_text is boolean (false if user asks for no text/copy)\n"
+    "- products must be subset of available_products (or empty for auto)\n"
+    'JSON schema: {"objective": "...", "days": 3, "build": true, "include_text": true, "products": ["slug"], "reason": "..."}'
+)
+
 
 @dataclass
 class TrendBrief:
@@ -45,6 +92,98 @@ class CampaignItem:
     subheadline: str
 
 
+def _dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; values JSON can't represent natively (e.g. ``Path``) become strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+def _write_artifacts(path: Path, artifacts: dict[str, Any]) -> None:
+    """Write artifacts.json compactly; report.md is the human-facing summary."""
+    path.write_bytes(_dumps(artifacts))
+
+
+class _TraceLog:
+    """Orchestration trace streamed to a JSONL file; only a bounded tail stays in memory."""
+
+    TAIL_SIZE = 200
+    FLUSH_EVERY = 64
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self.tail: deque[dict[str, Any]] = deque(maxlen=self.TAIL_SIZE)
+        self._pending: list[bytes] = []
+
+    def append(self, entry: dict[str, Any]) -> None:
+        self.count += 1
+        self.tail.append(entry)
+        self._pending.append(_dumps(entry) + b"\n")
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with open(self.path, "ab") as f:
+            f.writelines(self._pending)
+        self._pending.clear()
+
+
+def _extract_json(text: str) -> dict[str, Any] | None:
+    """Return the first JSON object embedded in an LLM response, or None."""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            parsed, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        return parsed
+    return None
+
+
+def _load_product(product_dir: Path) -> Product:
+    """``Product.load`` memoized per directory until product.json (or photos/) changes."""
+    try:
+        mtime_ns = (product_dir / "product.json").stat().st_mtime_ns
+    except OSError:
+        try:
+            mtime_ns = (product_dir / "photos").stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+    return _load_product_cached(str(product_dir.resolve()), mtime_ns)
+
+
+@lru_cache(maxsize=512)
+def _load_product_cached(product_dir: str, mtime_ns: int) -> Product:
+    return Product.load(Path(product_dir))
+
+
+def _shared_knowledge_base(knowledge_dir: Path) -> KnowledgeBase:
+    """One KnowledgeBase per knowledge dir, rebuilt when any of its JSON files changes."""
+    try:
+        with os.scandir(knowledge_dir) as it:
+            stamp = tuple(
+                sorted((e.name, e.stat().st_mtime_ns) for e in it if e.name.endswith(".json"))
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        stamp = ()
+    return _knowledge_base_cached(str(knowledge_dir.resolve()), stamp)
+
+
+@lru_cache(maxsize=4)
+def _knowledge_base_cached(knowledge_dir: str, stamp: tuple[tuple[str, int], ...]) -> KnowledgeBase:
+    return KnowledgeBase(knowledge_dir=Path(knowledge_dir))
+
+
+def _item_to_dict(item: CampaignItem) -> dict[str, Any]:
+    """Dict view of a CampaignItem; its fields are flat scalars, so a shallow copy suffices."""
+    return item.__dict__.copy()
+
+
 @dataclass
 class WorkerDecision:
     name: str
@@ -53,13 +192,36 @@ class WorkerDecision:
     params: dict[str, Any] = field(default_factory=dict)
 
 
+def _worker_to_dict(worker: WorkerDecision) -> dict[str, Any]:
+    """Flat dict view of a WorkerDecision."""
+    return {
+        "name": worker.name,
+        "run": worker.run,
+        "reason": worker.reason,
+        "params": dict(worker.params),
+    }
+
+
+def _trend_to_dict(trend: TrendBrief) -> dict[str, Any]:
+    """Dict view of a TrendBrief; containers are copied one level deep."""
+    return {
+        "industry": trend.industry,
+        "recommended_styles": list(trend.recommended_styles),
+        "key_insights": list(trend.key_insights),
+        "category_guidelines": {k: dict(v) for k, v in trend.category_guidelines.items()},
+        "source_mode": trend.source_mode,
+        "web_query": trend.web_query,
+        "web_sources": [dict(s) for s in trend.web_sources],
+    }
+
+
 class ResearchWorker:
     """Retrieval worker over local KB with optional LangSearch web search."""
 
     LANGSEARCH_ENDPOINT = "https://api.langsearch.com/v1/web-search"
 
-    def __init__(self, knowledge_dir: Path = Path("knowledge")):
-        self.kb = KnowledgeBase(knowledge_dir=knowledge_dir)
+    def __init__(self, knowledge_dir: Path = Path("knowledge"), kb: KnowledgeBase | None = None):
+        self.kb = kb if kb is not None else KnowledgeBase(knowledge_dir=knowledge_dir)
         self.langsearch_api_key = os.getenv("LANGSEARCH_API_KEY", "").strip()
 
     @staticmethod
@@ -190,29 +352,27 @@ class CopyWorker:
     """Simple deterministic copy generator."""
 
     THEMES = ["teaser", "main_offer", "last_chance", "social_proof", "reminder"]
+    # theme -> (headline, subheadline) templates; {base} is the product name.
+    THEME_TEMPLATES = {
+        "teaser": ("{base} que se siente distinto", "Pronto una propuesta visual nueva"),
+        "main_offer": ("{base} protagonista del dia", "Campana enfocada en {objective}"),
+        "last_chance": ("Ultimo impulso para {base}", "Cierre de campana con alta recordacion"),
+        "social_proof": (
+            "{base} recomendado por la comunidad",
+            "Confianza, consistencia y resultados",
+        ),
+        "reminder": ("{base} sigue en tendencia", "No cortes el momentum de la campana"),
+    }
 
     def run(self, products: dict[str, Product], days: int, objective: str) -> list[CampaignItem]:
         items: list[CampaignItem] = []
+        product_names = [(slug, product.name) for slug, product in products.items()]
+        n_themes = len(self.THEMES)
         for day in range(1, days + 1):
-            theme = self.THEMES[(day - 1) % len(self.THEMES)]
-            for product_slug, product in products.items():
-                base = product.name
-                if theme == "teaser":
-                    headline = f"{base} que se siente distinto"
-                    subheadline = "Pronto una propuesta visual nueva"
-                elif theme == "main_offer":
-                    headline = f"{base} protagonista del dia"
-                    subheadline = f"Campana enfocada en {objective}"
-                elif theme == "last_chance":
-                    headline = f"Ultimo impulso para {base}"
-                    subheadline = "Cierre de campana con alta recordacion"
-                elif theme == "social_proof":
-                    headline = f"{base} recomendado por la comunidad"
-                    subheadline = "Confianza, consistencia y resultados"
-                else:
-                    headline = f"{base} sigue en tendencia"
-                    subheadline = "No cortes el momentum de la campana"
-
+            theme = self.THEMES[(day - 1) % n_themes]
+            headline_fmt, subheadline_fmt = self.THEME_TEMPLATES[theme]
+            subheadline = subheadline_fmt.format(objective=objective)
+            for product_slug, base in product_names:
                 items.append(
                     CampaignItem(
                         day=day,
@@ -220,7 +380,7 @@ class CopyWorker:
                         product=product_slug,
                         size="feed",
                         style="",
-                        headline=headline,
+                        headline=headline_fmt.format(base=base),
                         subheadline=subheadline,
                     )
                 )
@@ -255,7 +415,14 @@ class QACriticWorker:
                 "details": error,
             }
 
-        if image_path is None or not image_path.exists():
+        # One stat answers both "does it exist" and "how big is it".
+        size_bytes: int | None = None
+        if image_path is not None:
+            try:
+                size_bytes = image_path.stat().st_size
+            except OSError:
+                pass
+        if size_bytes is None:
             return {
                 "ok": False,
                 "reason": "missing_file",
@@ -263,7 +430,6 @@ class QACriticWorker:
             }
 
         # Very lightweight heuristic: file should not be tiny/corrupted
-        size_bytes = image_path.stat().st_size
         if size_bytes < 20_000:
             return {
                 "ok": False,
@@ -277,16 +443,55 @@ class QACriticWorker:
             "details": f"Image looks valid ({size_bytes} bytes).",
         }
 
+    def run_batch(
+        self, images: list[Path | None], errors: list[str | None] | None = None
+    ) -> list[dict[str, Any]]:
+        """Review a whole generation round at once; verdicts keep input order."""
+        if errors is None:
+            errors = [None] * len(images)
+        return [self.run(image, error=error) for image, error in zip(images, errors, strict=True)]
+
 
 class OrchestratorCampaignService:
     """Lead orchestrator that coordinates specialist workers."""
 
+    STYLE_REF_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+    # Parallel image generations per round; overridable with CM_GEN_CONCURRENCY.
+    DEFAULT_GEN_CONCURRENCY = 5
+    # Exponential backoff (seconds) between generation retry rounds.
+    RETRY_BACKOFF_BASE = 0.25
+    RETRY_BACKOFF_MAX = 4.0
+
     def __init__(self, knowledge_dir: Path = Path("knowledge")):
-        self.research = ResearchWorker(knowledge_dir=knowledge_dir)
+        kb = _shared_knowledge_base(knowledge_dir)
+        self.research = ResearchWorker(kb=kb)
         self.copy = CopyWorker()
         self.design = DesignWorker()
         self.qa = QACriticWorker()
-        self.strategist = StrategistAgent(knowledge_dir=knowledge_dir)
+        self.strategist = StrategistAgent(knowledge=kb)
+        self._llm_client: Any = None
+        self._llm_client_probed = False
+
+    def _client(self) -> Any:
+        """Strategist's Anthropic client, probed once per service (None when unavailable)."""
+        if not self._llm_client_probed:
+            self._llm_client = self.strategist._get_client()
+            self._llm_client_probed = True
+        return self._llm_client
+
+    @classmethod
+    def _default_concurrency(cls) -> int:
+        raw = os.getenv("CM_GEN_CONCURRENCY", "").strip()
+        try:
+            return max(1, int(raw)) if raw else cls.DEFAULT_GEN_CONCURRENCY
+        except ValueError:
+            return cls.DEFAULT_GEN_CONCURRENCY
+
+    @classmethod
+    def _retry_delay(cls, attempts: int) -> float:
+        """Jittered exponential backoff before retry round `attempts + 1`."""
+        delay = min(cls.RETRY_BACKOFF_BASE * 2 ** (attempts - 1), cls.RETRY_BACKOFF_MAX)
+        return delay + random.random() * 0.1 if delay else 0.0
 
     @staticmethod
     def _extract_response_text(response: Any) -> str:
@@ -298,15 +503,26 @@ class OrchestratorCampaignService:
                 parts.append(text)
         return "\n".join(parts).strip()
 
-    @staticmethod
-    def _has_brand_style_reference(brand_dir: Path) -> bool:
-        refs_dir = brand_dir / "references"
-        if not refs_dir.exists():
-            return False
-        ref_files = []
-        for ext in ("*.jpg", "*.jpeg", "*.png", "*.webp"):
-            ref_files.extend(refs_dir.glob(ext))
-        return len(ref_files) > 0
+    @classmethod
+    def _list_style_references(cls, refs_dir: Path) -> list[Path]:
+        """List reference images with a single directory read, ordered by extension."""
+        exts = cls.STYLE_REF_EXTENSIONS
+        try:
+            with os.scandir(refs_dir) as it:
+                found = [
+                    (exts.index(suffix), Path(entry.path))
+                    for entry in it
+                    if (suffix := os.path.splitext(entry.name)[1].lower()) in exts
+                    and entry.is_file()
+                ]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        found.sort(key=lambda pair: pair[0])
+        return [path for _, path in found]
+
+    @classmethod
+    def _has_brand_style_reference(cls, brand_dir: Path) -> bool:
+        return bool(cls._list_style_references(brand_dir / "references"))
 
     @staticmethod
     def _infer_include_text(objective: str) -> bool:
@@ -418,7 +634,7 @@ class OrchestratorCampaignService:
 
         allowed = {"research", "copy", "design", "generate", "qa"}
 
-        client = self.strategist._get_client()
+        client = self._client()
         if client is None:
             return (
                 self._policy_worker_plan(
@@ -433,28 +649,17 @@ class OrchestratorCampaignService:
                 "fallback",
             )
 
-        user_prompt = (
-            "Decide which workers to run for this campaign request. Return ONLY strict JSON.\n"
-            "Hard constraints:\n"
-            "- If build=false: generate=false and qa=false\n"
-            "- If include_text=false: copy=false\n"
-            "- If build=true: generate must be true\n"
-            "Policy guidance:\n"
-            "- Run research if user asks for trends/inspiration OR if there is no style ref input and no brand references\n"
-            "- Run copy only if include_text=true\n"
-            "- Run design if build=true\n"
-            "- Run qa if build=true and max_retries>0\n\n"
-            f"brand={brand_slug}\n"
-            f"products={product_slugs}\n"
-            f"objective={objective}\n"
-            f"days={days}\n"
-            f"build={build}\n"
-            f"include_text={include_text}\n"
-            f"max_retries={max_retries}\n"
-            f"has_style_ref_input={has_style_ref_input}\n"
-            f"has_brand_style_ref={has_brand_style_ref}\n"
-            f"allowed_workers={sorted(allowed)}\n"
-            'JSON schema: {"workers": [{"name":"research","run":true,"reason":"...","params":{}}], "reason":"..."}'
+        user_prompt = _WORKER_PLAN_PROMPT.substitute(
+            brand_slug=brand_slug,
+            product_slugs=product_slugs,
+            objective=objective,
+            days=days,
+            build=build,
+            include_text=include_text,
+            max_retries=max_retries,
+            has_style_ref_input=has_style_ref_input,
+            has_brand_style_ref=has_brand_style_ref,
+            allowed_workers=sorted(allowed),
         )
 
         try:
@@ -481,24 +686,20 @@ class OrchestratorCampaignService:
                     "fallback",
                 )
 
-            try:
-                parsed = json.loads(text)
-            except json.JSONDecodeError:
-                match = re.search(r"\{[\s\S]*\}", text)
-                if not match:
-                    return (
-                        self._policy_worker_plan(
-                            build=build,
-                            include_text=include_text,
-                            has_style_ref_input=has_style_ref_input,
-                            has_brand_style_ref=has_brand_style_ref,
-                            objective=objective,
-                            max_retries=max_retries,
-                        ),
-                        "fallback_invalid_json",
-                        "fallback",
-                    )
-                parsed = json.loads(match.group())
+            parsed = _extract_json(text)
+            if parsed is None:
+                return (
+                    self._policy_worker_plan(
+                        build=build,
+                        include_text=include_text,
+                        has_style_ref_input=has_style_ref_input,
+                        has_brand_style_ref=has_brand_style_ref,
+                        objective=objective,
+                        max_retries=max_retries,
+                    ),
+                    "fallback_invalid_json",
+                    "fallback",
+                )
 
             raw_workers = parsed.get("workers", [])
             decisions_by_name: dict[str, WorkerDecision] = {
@@ -612,7 +813,7 @@ class OrchestratorCampaignService:
             "mode": "fallback",
         }
 
-        client = self.strategist._get_client()
+        client = self._client()
         if client is None:
             if require_llm_orchestrator:
                 raise RuntimeError(
@@ -620,17 +821,10 @@ class OrchestratorCampaignService:
                 )
             return default
 
-        prompt = (
-            "Convert the user request into execution params for campaign workers. Return ONLY strict JSON.\n"
-            f"brand={brand_slug}\n"
-            f"available_products={available_products}\n"
-            f"user_request={user_request}\n"
-            "Rules:\n"
-            "- days must be integer between 1 and 14\n"
-            "- build is boolean\n"
-            "- include_text is boolean (false if user asks for no text/copy)\n"
-            "- products must be subset of available_products (or empty for auto)\n"
-            'JSON schema: {"objective": "...", "days": 3, "build": true, "include_text": true, "products": ["slug"], "reason": "..."}'
+        prompt = _TRANSLATE_PROMPT.substitute(
+            brand_slug=brand_slug,
+            available_products=available_products,
+            user_request=user_request,
         )
 
         try:
@@ -650,15 +844,11 @@ class OrchestratorCampaignService:
                     )
                 return default
 
-            try:
-                parsed = json.loads(text)
-            except json.JSONDecodeError:
-                match = re.search(r"\{[\s\S]*\}", text)
-                if not match:
-                    if require_llm_orchestrator:
-                        raise RuntimeError("Strategist devolvió JSON inválido para traducción")
-                    return default
-                parsed = json.loads(match.group())
+            parsed = _extract_json(text)
+            if parsed is None:
+                if require_llm_orchestrator:
+                    raise RuntimeError("Strategist devolvió JSON inválido para traducción")
+                return default
 
             objective = str(parsed.get("objective") or default["objective"]).strip()
             try:
@@ -708,7 +898,7 @@ class OrchestratorCampaignService:
             require_llm_orchestrator=require_llm_orchestrator,
         )
 
-        result = self.run(
+        return self.run(
             brand_slug=brand_slug,
             product_slugs=translation["products"] or None,
             objective=translation["objective"],
@@ -718,15 +908,11 @@ class OrchestratorCampaignService:
             style_ref=style_ref,
             max_retries=max_retries,
             require_llm_orchestrator=require_llm_orchestrator,
+            extra_artifacts={"input_translation": translation},
+            # Reuse the discovery above rather than letting run() scan the dirs again.
+            discovered_products=available_products,
         )
 
-        artifacts = result["artifacts"]
-        artifacts["input_translation"] = translation
-        with open(result["run_dir"] / "artifacts.json", "w", encoding="utf-8") as f:
-            json.dump(artifacts, f, indent=2, ensure_ascii=False)
-        result["artifacts"] = artifacts
-        return result
-
     def run(
         self,
         brand_slug: str,
@@ -738,8 +924,14 @@ class OrchestratorCampaignService:
         style_ref: Path | None = None,
         max_retries: int = 1,
         require_llm_orchestrator: bool = False,
+        max_concurrent: int | None = None,
+        extra_artifacts: dict[str, Any] | None = None,
+        discovered_products: list[str] | None = None,
     ) -> dict[str, Any]:
-        run_id = f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid4().hex[:6]}"
+        if max_concurrent is None:
+            max_concurrent = self._default_concurrency()
+        started_at = datetime.now()
+        run_id = f"run-{started_at:%Y%m%d-%H%M%S}-{uuid4().hex[:6]}"
         run_dir = Path("outputs") / "agent_runs" / run_id
         run_dir.mkdir(parents=True, exist_ok=True)
 
@@ -754,7 +946,11 @@ class OrchestratorCampaignService:
         )
 
         if not product_slugs:
-            product_slugs = self._discover_products_with_photos(brand_slug)
+            product_slugs = (
+                discovered_products
+                if discovered_products is not None
+                else self._discover_products_with_photos(brand_slug)
+            )
             if not product_slugs:
                 raise FileNotFoundError(
                     f"No hay productos con fotos en brands/{brand_slug}/products/ ni products/{brand_slug}/. "
@@ -762,15 +958,17 @@ class OrchestratorCampaignService:
                 )
 
         products: dict[str, Product] = {}
+        product_dirs: dict[str, Path] = {}
         for slug in product_slugs:
             product_dir = self._find_product_dir(brand_slug, slug)
             if not product_dir:
                 raise FileNotFoundError(
                     f"Producto no encontrado: brands/{brand_slug}/products/{slug} (ni ruta legacy products/{brand_slug}/{slug})"
                 )
-            products[slug] = Product.load(product_dir)
+            product_dirs[slug] = product_dir
+            products[slug] = _load_product(product_dir)
 
-        if require_llm_orchestrator and self.strategist._get_client() is None:
+        if require_llm_orchestrator and self._client() is None:
             raise RuntimeError(
                 "LLM orchestrator requerido pero ANTHROPIC_API_KEY no está configurada."
             )
@@ -791,242 +989,277 @@ class OrchestratorCampaignService:
 
         decisions_by_name = {d.name: d for d in worker_decisions}
 
-        orchestration_trace: list[dict[str, Any]] = [
-            {
-                "step": "orchestration_decision",
-                "worker_sequence": worker_sequence,
-                "reason": worker_reason,
-                "include_text": effective_include_text,
-            }
-        ]
+        # Entries go to trace.jsonl as they happen; artifacts keep the last
+        # TAIL_SIZE of them so memory doesn't grow with items x attempts.
+        trace_log = _TraceLog(run_dir / "trace.jsonl")
+        _trace_append = trace_log.append
 
-        trend = TrendBrief(
-            industry=brand.industry or "generic",
-            recommended_styles=brand.get_preferred_styles() or ["minimal_clean"],
-            key_insights=[f"Objective focus: {objective}"],
-            category_guidelines={},
-        )
-        if decisions_by_name.get("research", WorkerDecision("research", False)).run:
-            trend = self.research.run(brand=brand, products=products, objective=objective)
-            orchestration_trace.append(
-                {
-                    "step": "worker_done",
-                    "worker": "research",
-                    "source_mode": trend.source_mode,
-                    "web_sources": len(trend.web_sources),
-                }
-            )
+        def _trace(step: str, **fields: Any) -> None:
+            _trace_append({"step": step, **fields})
 
-        def _items_without_copy() -> list[CampaignItem]:
-            items: list[CampaignItem] = []
-            theme_cycle = CopyWorker.THEMES
-            for day_idx in range(1, days + 1):
-                theme = theme_cycle[(day_idx - 1) % len(theme_cycle)]
-                for product_slug in products.keys():
-                    items.append(
-                        CampaignItem(
-                            day=day_idx,
-                            theme=theme,
-                            product=product_slug,
-                            size="feed",
-                            style="",
-                            headline="",
-                            subheadline="",
-                        )
-                    )
-            return items
-
-        if decisions_by_name.get("copy", WorkerDecision("copy", False)).run:
-            copy_items = self.copy.run(products=products, days=days, objective=objective)
-            orchestration_trace.append({"step": "worker_done", "worker": "copy"})
-        else:
-            copy_items = _items_without_copy()
-            orchestration_trace.append(
-                {"step": "worker_skipped", "worker": "copy", "reason": "plan"}
+        # Flush on failure too: the trace of a run that raised is the one to debug.
+        try:
+            _trace(
+                "orchestration_decision",
+                worker_sequence=worker_sequence,
+                reason=worker_reason,
+                include_text=effective_include_text,
             )
 
-        if decisions_by_name.get("design", WorkerDecision("design", False)).run:
-            selected_style, visual_direction, designed_items = self.design.run(trend, copy_items)
-            orchestration_trace.append({"step": "worker_done", "worker": "design"})
-        else:
-            selected_style = (brand.get_preferred_styles() or ["minimal_clean"])[0]
-            visual_direction = build_visual_direction_from_style(selected_style)
-            designed_items = [
-                CampaignItem(**{**asdict(i), "style": selected_style}) for i in copy_items
-            ]
-            orchestration_trace.append(
-                {"step": "worker_skipped", "worker": "design", "reason": "plan"}
+            trend = TrendBrief(
+                industry=brand.industry or "generic",
+                recommended_styles=brand.get_preferred_styles() or ["minimal_clean"],
+                key_insights=[f"Objective focus: {objective}"],
+                category_guidelines={},
             )
+            if decisions_by_name.get("research", WorkerDecision("research", False)).run:
+                trend = self.research.run(brand=brand, products=products, objective=objective)
+                _trace(
+                    "worker_done",
+                    worker="research",
+                    source_mode=trend.source_mode,
+                    web_sources=len(trend.web_sources),
+                )
 
-        generation_results: list[dict[str, Any]] = []
-        qa_enabled = decisions_by_name.get("qa", WorkerDecision("qa", False)).run
-        generate_enabled = decisions_by_name.get("generate", WorkerDecision("generate", False)).run
+            def _items_without_copy() -> list[CampaignItem]:
+                theme_cycle = CopyWorker.THEMES
+                n_themes = len(theme_cycle)
+                product_slugs_list = list(products)
+                return [
+                    CampaignItem(
+                        day=day_idx,
+                        theme=theme_cycle[(day_idx - 1) % n_themes],
+                        product=product_slug,
+                        size="feed",
+                        style="",
+                        headline="",
+                        subheadline="",
+                    )
+                    for day_idx in range(1, days + 1)
+                    for product_slug in product_slugs_list
+                ]
 
-        if build and generate_enabled:
-            pipeline = GenerationPipeline(
-                generator_model="gpt-image-1.5", design_style=selected_style
-            )
-            reference_path = self._resolve_style_reference(style_ref, brand_dir)
+            if decisions_by_name.get("copy", WorkerDecision("copy", False)).run:
+                copy_items = self.copy.run(products=products, days=days, objective=objective)
+                _trace("worker_done", worker="copy")
+            else:
+                copy_items = _items_without_copy()
+                _trace("worker_skipped", worker="copy", reason="plan")
 
-            for item in designed_items:
-                product_dir = self._find_product_dir(brand_slug, item.product)
-                if not product_dir:
-                    generation_results.append(
-                        {
-                            "item": asdict(item),
-                            "error": f"Producto no encontrado para build: {item.product}",
-                        }
-                    )
-                    continue
-                product_obj = products[item.product]
-                product_ref = None
-                try:
-                    product_ref = product_obj.get_main_photo(product_dir)
-                except Exception:
-                    product_ref = None
+            if decisions_by_name.get("design", WorkerDecision("design", False)).run:
+                selected_style, visual_direction, designed_items = self.design.run(
+                    trend, copy_items
+                )
+                _trace("worker_done", worker="design")
+            else:
+                selected_style = (brand.get_preferred_styles() or ["minimal_clean"])[0]
+                visual_direction = build_visual_direction_from_style(selected_style)
+                designed_items = [replace(i, style=selected_style) for i in copy_items]
+                _trace("worker_skipped", worker="design", reason="plan")
+
+            # Items are final from here on: build their dict form once and share it
+            # across trace entries, generation results and the campaign_items artifact.
+            item_dicts = [_item_to_dict(i) for i in designed_items]
+
+            generation_results: list[dict[str, Any]] = []
+            qa_enabled = decisions_by_name.get("qa", WorkerDecision("qa", False)).run
+            generate_enabled = decisions_by_name.get(
+                "generate", WorkerDecision("generate", False)
+            ).run
+
+            if build and generate_enabled:
+                # Only build runs need the generation stack; plan-only runs skip its import.
+                from ..pipeline import GenerationPipeline
+
+                pipeline = GenerationPipeline(
+                    generator_model="gpt-image-1.5", design_style=selected_style
+                )
+                reference_path = self._resolve_style_reference(style_ref, brand_dir)
+                max_attempts = max(1, max_retries + 1) if qa_enabled else 1
 
-                if product_ref is not None and not Path(product_ref).exists():
-                    generation_results.append(
-                        {
-                            "item": asdict(item),
-                            "error": f"Referencia de producto no encontrada: {product_ref}",
-                        }
+                # Items of the same product share its directory and main photo: resolve
+                # and validate those once per product instead of once per item.
+                product_cache: dict[str, tuple[Path | None, Path | None, str | None]] = {}
+                for slug, product_obj in products.items():
+                    product_dir = product_dirs.get(slug)
+                    product_ref = None
+                    error = None
+                    if not product_dir:
+                        error = f"Producto no encontrado para build: {slug}"
+                    else:
+                        product_ref = self._safe_main_photo(product_obj, product_dir)
+                        if product_ref is not None and not Path(product_ref).exists():
+                            error = f"Referencia de producto no encontrada: {product_ref}"
+                    product_cache[slug] = (product_dir, product_ref, error)
+
+                # Items that cannot be built are reported right away and never enter
+                # the generation rounds.
+                item_results: list[list[dict[str, Any]]] = [[] for _ in designed_items]
+                pending: list[tuple[int, dict[str, Any]]] = []
+                for idx, item in enumerate(designed_items):
+                    product_dir, product_ref, error = product_cache[item.product]
+                    if error:
+                        item_results[idx].append({"item": item_dicts[idx], "error": error})
+                        continue
+                    pending.append(
+                        (
+                            idx,
+                            {
+                                "product_dir": product_dir,
+                                "target_sizes": [item.size],
+                                "include_text": effective_include_text,
+                                "product_ref_path": product_ref if product_ref else None,
+                                # Items run concurrently and several can share a product:
+                                # each one writes under its own dir so <product>_v1.png
+                                # never collides (QA must review this item's image).
+                                "campaign_dir": run_dir / "items" / f"{idx + 1:02d}",
+                                "headline": item.headline,
+                                "subheadline": item.subheadline,
+                                "theme": item.theme,
+                            },
+                        )
                     )
-                    continue
 
-                item_done = False
-                last_error: str | None = None
+                # Each round generates every pending item concurrently (I/O-bound on
+                # remote model latency), then QA reviews the whole round in one batch.
+                # Items that fail QA go back into the bucket for the next round.
+                qa_skipped = {"ok": True, "reason": "skipped", "details": "QA disabled by plan."}
+                last_errors: dict[int, str] = {}
                 attempts = 0
-                max_attempts = max(1, max_retries + 1) if qa_enabled else 1
-
-                while attempts < max_attempts and not item_done:
+                while pending and attempts < max_attempts:
+                    if attempts:
+                        time.sleep(self._retry_delay(attempts))
                     attempts += 1
-                    orchestration_trace.append(
-                        {
-                            "step": "generate_item",
-                            "item": asdict(item),
-                            "attempt": attempts,
-                        }
+                    for idx, _ in pending:
+                        _trace("generate_item", item=item_dicts[idx], attempt=attempts)
+                    # Rounds are slow: keep trace.jsonl current while they run.
+                    trace_log.flush()
+
+                    outcomes = pipeline.run_batch(
+                        reference_path=reference_path,
+                        brand_dir=brand_dir,
+                        entries=[kwargs for _, kwargs in pending],
+                        max_concurrent=max_concurrent,
                     )
-                    try:
-                        results = pipeline.run(
-                            reference_path=reference_path,
-                            brand_dir=brand_dir,
-                            product_dir=product_dir,
-                            target_sizes=[item.size],
-                            include_text=effective_include_text,
-                            product_ref_path=product_ref if product_ref else None,
-                            campaign_dir=None,
-                            headline=item.headline,
-                            subheadline=item.subheadline,
-                            theme=item.theme,
+                    if qa_enabled:
+                        verdicts = self.qa.run_batch(
+                            [results[0].image_path if results else None for results, _ in outcomes],
+                            errors=[error for _, error in outcomes],
                         )
-
-                        first_image = results[0].image_path if results else None
-                        qa = {"ok": True, "reason": "skipped", "details": "QA disabled by plan."}
+                    else:
+                        verdicts = [qa_skipped] * len(outcomes)
+
+                    retry: list[tuple[int, dict[str, Any]]] = []
+                    for entry, (results, error), qa in zip(
+                        pending, outcomes, verdicts, strict=True
+                    ):
+                        idx = entry[0]
                         if qa_enabled:
-                            qa = self.qa.run(first_image)
-                            orchestration_trace.append(
-                                {
-                                    "step": "qa_check",
-                                    "item": asdict(item),
-                                    "attempt": attempts,
-                                    "qa": qa,
-                                }
-                            )
-
-                        if qa["ok"]:
-                            generation_results.extend(
-                                [
-                                    {
-                                        "item": asdict(item),
-                                        "image_path": str(r.image_path),
-                                        "cost_usd": r.cost_usd,
-                                        "attempt": attempts,
-                                        "qa": qa,
-                                    }
-                                    for r in results
-                                ]
+                            _trace("qa_check", item=item_dicts[idx], attempt=attempts, qa=qa)
+                        if error is None and qa["ok"]:
+                            # Records only differ per output; they are serialized,
+                            # never mutated, so the item dict and QA verdict are shared.
+                            base = {"item": item_dicts[idx], "attempt": attempts, "qa": qa}
+                            item_results[idx].extend(
+                                {**base, "image_path": str(r.image_path), "cost_usd": r.cost_usd}
+                                for r in results
                             )
-                            item_done = True
                         else:
-                            last_error = f"QA failed: {qa['reason']}"
-                    except Exception as e:
-                        last_error = str(e)
-                        if qa_enabled:
-                            qa = self.qa.run(None, error=last_error)
-                            orchestration_trace.append(
-                                {
-                                    "step": "qa_check",
-                                    "item": asdict(item),
-                                    "attempt": attempts,
-                                    "qa": qa,
-                                }
-                            )
+                            last_errors[idx] = error or f"QA failed: {qa['reason']}"
+                            retry.append(entry)
+                    pending = retry
 
-                if not item_done:
-                    generation_results.append(
+                for idx, _ in pending:
+                    item_results[idx].append(
                         {
-                            "item": asdict(item),
-                            "error": last_error or "unknown_error",
+                            "item": item_dicts[idx],
+                            "error": last_errors.get(idx) or "unknown_error",
                             "attempts": attempts,
                         }
                     )
 
-        artifacts = {
-            "run_id": run_id,
-            "created_at": datetime.now().isoformat(),
-            "input": {
-                "brand": brand_slug,
-                "products": product_slugs,
-                "objective": objective,
-                "days": days,
-                "build": build,
-                "include_text": effective_include_text,
-                "max_retries": max_retries,
-            },
-            "worker_plan": {
-                "sequence": worker_sequence,
-                "reason": worker_reason,
-                "mode": orchestrator_mode,
-                "workers": [asdict(w) for w in worker_decisions],
-            },
-            "trend_brief": asdict(trend),
-            "selected_style": selected_style,
-            "visual_direction": visual_direction,
-            "campaign_items": [asdict(i) for i in designed_items],
-            "orchestration_trace": orchestration_trace,
-            "generation": generation_results,
-        }
-
-        with open(run_dir / "artifacts.json", "w", encoding="utf-8") as f:
-            json.dump(artifacts, f, indent=2, ensure_ascii=False)
-
-        self._write_report(run_dir, artifacts)
+                for entries in item_results:
+                    generation_results.extend(entries)
+
+            artifacts = {
+                "run_id": run_id,
+                "created_at": started_at.isoformat(),
+                "input": {
+                    "brand": brand_slug,
+                    "products": product_slugs,
+                    "objective": objective,
+                    "days": days,
+                    "build": build,
+                    "include_text": effective_include_text,
+                    "max_retries": max_retries,
+                },
+                "worker_plan": {
+                    "sequence": worker_sequence,
+                    "reason": worker_reason,
+                    "mode": orchestrator_mode,
+                    "workers": [_worker_to_dict(w) for w in worker_decisions],
+                },
+                "trend_brief": _trend_to_dict(trend),
+                "selected_style": selected_style,
+                "visual_direction": visual_direction,
+                "campaign_items": item_dicts,
+                "orchestration_trace": list(trace_log.tail),
+                "orchestration_trace_file": trace_log.path.name,
+                "orchestration_trace_count": trace_log.count,
+                "generation": generation_results,
+            }
+            if extra_artifacts:
+                artifacts.update(extra_artifacts)
+        finally:
+            trace_log.flush()
+
+        # The JSON dump dominates on large traces: let it run on a worker thread
+        # while the report is rendered, and surface any write error here.
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            artifacts_written = writer.submit(
+                _write_artifacts, run_dir / "artifacts.json", artifacts
+            )
+            self._write_report(run_dir, artifacts)
+            artifacts_written.result()
         return {"run_id": run_id, "run_dir": run_dir, "artifacts": artifacts}
 
     @staticmethod
     def _discover_products_with_photos(brand_slug: str) -> list[str]:
         roots = [Path("brands") / brand_slug / "products", Path("products") / brand_slug]
         discovered: list[str] = []
+        seen: set[str] = set()
         for products_dir in roots:
-            if not products_dir.exists():
+            try:
+                it = os.scandir(products_dir)
+            except (FileNotFoundError, NotADirectoryError):
                 continue
-            for product_dir in products_dir.iterdir():
-                if not product_dir.is_dir():
-                    continue
-                try:
-                    product = Product.load(product_dir)
-                    photo_path = product.get_main_photo(product_dir)
-                    if not Path(photo_path).exists():
+            with it:
+                for entry in it:
+                    # DirEntry caches the d_type from the directory read, so this
+                    # avoids one stat per entry (symlinked product dirs still get
+                    # followed, as with Path.is_dir); already seen slugs skip the load.
+                    if entry.name in seen or not entry.is_dir():
                         continue
-                    if product_dir.name not in discovered:
-                        discovered.append(product_dir.name)
-                except Exception:
-                    continue
+                    product_dir = products_dir / entry.name
+                    try:
+                        product = _load_product(product_dir)
+                        photo_path = product.get_main_photo(product_dir)
+                        if not Path(photo_path).exists():
+                            continue
+                    except Exception:
+                        continue
+                    seen.add(entry.name)
+                    discovered.append(entry.name)
 
         return discovered
 
+    @staticmethod
+    def _safe_main_photo(product: Product, product_dir: Path) -> Path | None:
+        try:
+            return product.get_main_photo(product_dir)
+        except Exception:
+            return None
+
     @staticmethod
     def _find_product_dir(brand_slug: str, product_slug: str) -> Path | None:
         candidates = [
@@ -1038,18 +1271,14 @@ class OrchestratorCampaignService:
                 return c
         return None
 
-    @staticmethod
-    def _resolve_style_reference(style_ref: Path | None, brand_dir: Path) -> Path:
+    @classmethod
+    def _resolve_style_reference(cls, style_ref: Path | None, brand_dir: Path) -> Path:
         if style_ref and style_ref.exists():
             return style_ref
 
-        refs_dir = brand_dir / "references"
-        if refs_dir.exists():
-            ref_files = []
-            for ext in ("*.jpg", "*.jpeg", "*.png", "*.webp"):
-                ref_files.extend(refs_dir.glob(ext))
-            if ref_files:
-                return ref_files[0]
+        ref_files = cls._list_style_references(brand_dir / "references")
+        if ref_files:
+            return ref_files[0]
 
         raise FileNotFoundError(
             "No se encontro style reference. Pasar --style-ref o agregar imagen en brands/<marca>/references/."
@@ -1058,6 +1287,12 @@ class OrchestratorCampaignService:
     @staticmethod
     def _write_report(run_dir: Path, artifacts: dict[str, Any]) -> None:
         trend = artifacts.get("trend_brief", {})
+        generated = errors = 0
+        for g in artifacts.get("generation", ()):
+            if "image_path" in g:
+                generated += 1
+            if "error" in g:
+                errors += 1
         report = [
             f"# Agent Campaign Run {artifacts['run_id']}",
             "",
@@ -1071,15 +1306,16 @@ class OrchestratorCampaignService:
             f"- Industry: {trend.get('industry', '-')}",
             f"- Selected style: {artifacts.get('selected_style', '-')}",
             f"- Research source mode: {trend.get('source_mode', 'knowledge_base')}",
-            f"- Web sources: {len(trend.get('web_sources', []))}",
+            f"- Web sources: {len(trend.get('web_sources', ()))}",
             "",
             "## Items",
-            f"- Total items: {len(artifacts.get('campaign_items', []))}",
-            f"- Generated outputs: {len([g for g in artifacts.get('generation', []) if 'image_path' in g])}",
-            f"- Errors: {len([g for g in artifacts.get('generation', []) if 'error' in g])}",
+            f"- Total items: {len(artifacts.get('campaign_items', ()))}",
+            f"- Generated outputs: {generated}",
+            f"- Errors: {errors}",
             "",
             "Artifacts:",
             "- artifacts.json",
+            "- trace.jsonl",
         ]
 
         with open(run_dir / "report.md", "w", encoding="utf-8") as f:
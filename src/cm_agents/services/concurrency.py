@@ -0,0 +1,21 @@
+"""Concurrencia acotada para los batches de generación (I/O contra APIs remotas)."""
+
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_bounded(fn: Callable[[T], R], items: Sequence[T], max_concurrent: int) -> list[R]:
+    """Aplica `fn` a cada item en un pool de a lo sumo `max_concurrent` threads.
+
+    Devuelve los resultados alineados con `items`. Una excepción de `fn` se
+    propaga: quien necesite aislar fallos por item los atrapa dentro de `fn`.
+    """
+    if not items:
+        return []
+    workers = max(1, min(max_concurrent, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, items))
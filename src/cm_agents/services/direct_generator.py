@@ -9,10 +9,17 @@ Flujo:
 """
 
 import base64
+import io
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from string import Template
 
-from openai import OpenAI
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+from PIL import Image, UnidentifiedImageError
 from rich.console import Console
 
 from ..models.campaign_style import CampaignStyleGuide
@@ -21,6 +28,9 @@ from ..models.product import Product
 console = Console()
 logger = logging.getLogger(__name__)
 
+# Lado máximo (px) de referencias de estilo/tipografía enviadas al modelo
+REFERENCE_MAX_EDGE = 1024
+
 # Costos estimados
 COST_PER_IMAGE = {
     "gpt-image-1": 0.04,
@@ -28,6 +38,74 @@ COST_PER_IMAGE = {
 }
 
 
+# Prompts fijos; solo se sustituyen los campos que cambian por variante
+_BASE_PROMPT = Template(
+    """You are a professional advertising photographer and art director.
+
+TASK: Create a promotional image for the product shown below.
+
+$style_instructions
+
+SCENE DESCRIPTION:
+$scene_prompt
+
+CRITICAL REQUIREMENTS:
+1. PRODUCT FIDELITY: The product must be EXACTLY as shown in the product image - same shape, colors, labels, brand, packaging. Do NOT modify the product appearance.
+2. NO TEXT: Do NOT add any text, prices, headlines, or typography to the image. Text will be added in a separate step.
+3. COMPOSITION: Leave clear space for text overlay (approximately top 20% or bottom 25% of the image).
+4. STYLE: Match the visual style, lighting, and mood from the style reference images.
+5. PROFESSIONAL QUALITY: Studio-quality lighting, sharp focus on product, cohesive color grading.
+
+Generate a single promotional image following these requirements."""
+)
+
+_SCENE_PROMPT = Template(
+    """You are a professional advertising photographer and art director.
+
+TASK: Create ONE image that combines:
+1. The SCENE REFERENCE as the background, environment, lighting, and mood. Use that image as the exact visual reference for the setting.
+2. An EXACT REPLICA of the PRODUCT from the product reference. The product must be a precise replica: same shape, colors, labels, brand, packaging, every detail. Place it naturally in the scene.
+
+$style_instructions$angle_instructions
+
+CRITICAL REQUIREMENTS:
+1. PRODUCT: The product must be an exact replica of the product reference image - do not modify, reinterpret, or stylize it. Same shape, colors, labels, brand, every detail.
+2. SCENE: Match the background, lighting, atmosphere, and mood from the scene reference. The product should look like it belongs in that environment.
+3. NO TEXT: Do NOT add any text, prices, headlines, or typography. Text will be added in a separate step.
+4. Leave clear space for text overlay (approximately top 20% or bottom 25% of the image).
+5. Professional quality: sharp focus on product, cohesive lighting.
+
+Generate a single promotional image following these requirements."""
+)
+
+_EDIT_PROMPT = Template(
+    """You are a professional graphic designer. Add text to the image using the SOURCE REFERENCE image for style only.
+
+RULES:
+1. SOURCE REFERENCE (the reference image): Take the typography STYLE from it — font, weight, look. Replicate that style. Do NOT copy the words written in that image.
+2. REPLICA: The letters must look like the reference (same font, same weight). The words must be exactly what we specify below — our headline and our subheadline.
+3. Write ONLY these exact texts (nothing else):
+
+HEADLINE (once only): "$headline"
+$subheadline_instruction
+
+CRITICAL:
+- Style from reference image; content from us. No extra text, no "SUPER Descuento", no repeated headline, no text from the reference image.
+- Do NOT add any price, price badge, currency, or monetary amount to the image.
+- Do not modify product or background. High contrast, readable."""
+)
+
+
+def _progress(msg: str) -> None:
+    """Detalle de progreso por imagen (logger DEBUG).
+
+    Rich solo queda para los hitos ([OK]/[X]); con varias variantes en paralelo
+    el formateo y el lock de la consola por cada línea no compensan.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[DirectGen] %s", msg)
+
+
 def load_image_as_base64(path: Path) -> str:
     """Carga imagen como base64."""
     with open(path, "rb") as f:
@@ -46,6 +124,65 @@ def get_media_type(path: Path) -> str:
     }.get(suffix, "image/png")
 
 
+def load_image_data_url(path: Path, max_edge: int | None = None) -> str:
+    """Data URL (`data:<media>;base64,...`) de una imagen de referencia.
+
+    Producto, estilo y fuente se reenvían igual en cada variante: se codifican una
+    vez y se reusan mientras el archivo no cambie (mtime/tamaño).
+
+    Con `max_edge`, las imágenes más grandes se reducen (Lanczos) y se recodifican
+    a JPEG; para referencias de estilo alcanza y el request pesa mucho menos.
+    """
+    st = path.stat()
+    return _image_data_url_cached(str(path.resolve()), st.st_mtime_ns, st.st_size, max_edge)
+
+
+@lru_cache(maxsize=1)
+def _shared_client() -> OpenAI:
+    """Cliente OpenAI compartido por todas las instancias del proceso.
+
+    `get_direct_generator()` crea un generador por campaña; con un cliente único
+    el pool de conexiones (y los handshakes TLS) se reusa entre corridas y entre
+    variantes generadas en paralelo.
+    """
+    return OpenAI(
+        http_client=DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+        )
+    )
+
+
+def _style_ref_data_url(path: Path) -> str | None:
+    """Data URL reducida de una referencia de estilo o fuente; None si el archivo no existe.
+
+    Si PIL no puede decodificarla (formato no soportado, archivo truncado) se
+    manda tal cual, sin reducir, como antes de achicar las referencias.
+    """
+    try:
+        return load_image_data_url(path, REFERENCE_MAX_EDGE)
+    except FileNotFoundError:
+        return None
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning("No se pudo reducir la referencia %s (%s); se envía sin reducir", path, e)
+        return load_image_data_url(path)
+
+
+@lru_cache(maxsize=16)
+def _image_data_url_cached(path: str, mtime_ns: int, size: int, max_edge: int | None) -> str:
+    image_path = Path(path)
+    if max_edge:
+        with Image.open(image_path) as img:
+            if max(img.size) > max_edge:
+                img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+                rgba = img.convert("RGBA")
+                flat = Image.new("RGB", rgba.size, "white")
+                flat.paste(rgba, mask=rgba.getchannel("A"))
+                buf = io.BytesIO()
+                flat.save(buf, "JPEG", quality=85, optimize=True)
+                return f"data:image/jpeg;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+    return f"data:{get_media_type(image_path)};base64,{load_image_as_base64(image_path)}"
+
+
 class DirectGenerator:
     """Generador directo usando Responses API de OpenAI.
 
@@ -64,10 +201,11 @@ class DirectGenerator:
             model: Modelo de generación de imágenes (gpt-image-1.5 recomendado)
             chat_model: Modelo de chat para Responses API
         """
-        self.client = OpenAI()
+        self.client = _shared_client()
         self.model = model
         self.chat_model = chat_model
         self.cost_accumulated = 0.0
+        self._cost_lock = threading.Lock()
 
     def generate_base_image(
         self,
@@ -91,9 +229,35 @@ class DirectGenerator:
         Returns:
             Tuple de (path a imagen generada, costo en USD)
         """
-        console.print("\n[blue][DirectGen][/blue] Generando imagen base...")
-        console.print(f"[dim]   Producto: {product_image.name}[/dim]")
-        console.print(f"[dim]   Referencias de estilo: {len(style_refs)}[/dim]")
+        image_data, cost = self._base_image_payload(
+            product_image, style_refs, scene_prompt, style_guide, size
+        )
+
+        # Guardar imagen
+        if output_path is None:
+            output_path = Path("outputs") / "direct" / "base_image.png"
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        output_path.write_bytes(base64.b64decode(image_data))
+
+        console.print(f"[green][OK][/green] Imagen base generada: {output_path}")
+        _progress(f"Costo: ${cost:.4f}")
+
+        return output_path, cost
+
+    def _base_image_payload(
+        self,
+        product_image: Path,
+        style_refs: list[Path],
+        scene_prompt: str,
+        style_guide: CampaignStyleGuide | None,
+        size: str,
+    ) -> tuple[str, float]:
+        """Llama a la API para la imagen base; devuelve (PNG en base64, costo)."""
+        _progress("Generando imagen base...")
+        _progress(f"Producto: {product_image.name}")
+        _progress(f"Referencias de estilo: {len(style_refs)}")
 
         # Construir contenido multimodal
         content_parts = []
@@ -109,23 +273,9 @@ STYLE GUIDE:
 - Mood: {style_guide.atmosphere}
 """
 
-        main_prompt = f"""You are a professional advertising photographer and art director.
-
-TASK: Create a promotional image for the product shown below.
-
-{style_instructions}
-
-SCENE DESCRIPTION:
-{scene_prompt}
-
-CRITICAL REQUIREMENTS:
-1. PRODUCT FIDELITY: The product must be EXACTLY as shown in the product image - same shape, colors, labels, brand, packaging. Do NOT modify the product appearance.
-2. NO TEXT: Do NOT add any text, prices, headlines, or typography to the image. Text will be added in a separate step.
-3. COMPOSITION: Leave clear space for text overlay (approximately top 20% or bottom 25% of the image).
-4. STYLE: Match the visual style, lighting, and mood from the style reference images.
-5. PROFESSIONAL QUALITY: Studio-quality lighting, sharp focus on product, cohesive color grading.
-
-Generate a single promotional image following these requirements."""
+        main_prompt = _BASE_PROMPT.substitute(
+            style_instructions=style_instructions, scene_prompt=scene_prompt
+        )
 
         content_parts.append({"type": "input_text", "text": main_prompt})
 
@@ -134,10 +284,8 @@ Generate a single promotional image following these requirements."""
             {"type": "input_text", "text": "\n--- PRODUCT IMAGE (replicate this EXACTLY) ---"}
         )
 
-        product_b64 = load_image_as_base64(product_image)
-        product_media = get_media_type(product_image)
         content_parts.append(
-            {"type": "input_image", "image_url": f"data:{product_media};base64,{product_b64}"}
+            {"type": "input_image", "image_url": load_image_data_url(product_image)}
         )
 
         # Agregar referencias visuales de estilo
@@ -149,17 +297,18 @@ Generate a single promotional image following these requirements."""
                 }
             )
 
-            for i, ref_path in enumerate(style_refs[:3]):  # Máximo 3 refs
-                if ref_path.exists():
-                    ref_b64 = load_image_as_base64(ref_path)
-                    ref_media = get_media_type(ref_path)
-                    content_parts.append(
-                        {"type": "input_image", "image_url": f"data:{ref_media};base64,{ref_b64}"}
-                    )
-                    console.print(f"[dim]   + Ref {i + 1}: {ref_path.name}[/dim]")
+            # Máximo 3 refs; se leen/codifican en paralelo y se agregan en orden.
+            # Las que no existen se descartan con el mismo stat de la lectura.
+            refs = style_refs[:3]
+            with ThreadPoolExecutor(max_workers=len(refs)) as executor:
+                ref_urls = list(executor.map(_style_ref_data_url, refs))
+            loaded = [(path, url) for path, url in zip(refs, ref_urls) if url]
+            for i, (ref_path, ref_url) in enumerate(loaded):
+                content_parts.append({"type": "input_image", "image_url": ref_url})
+                _progress(f"+ Ref {i + 1}: {ref_path.name}")
 
         # Llamar a Responses API
-        console.print("[dim]   Generando con Responses API...[/dim]")
+        _progress("Generando con Responses API...")
 
         try:
             response = self.client.responses.create(
@@ -184,23 +333,11 @@ Generate a single promotional image following these requirements."""
             if not image_data:
                 raise ValueError("No se generó imagen en la respuesta")
 
-            # Guardar imagen
-            if output_path is None:
-                output_path = Path("outputs") / "direct" / "base_image.png"
-
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            image_bytes = base64.b64decode(image_data)
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-
             cost = COST_PER_IMAGE.get(self.model, 0.08)
-            self.cost_accumulated += cost
+            with self._cost_lock:
+                self.cost_accumulated += cost
 
-            console.print(f"[green][OK][/green] Imagen base generada: {output_path}")
-            console.print(f"[dim]   Costo: ${cost:.4f}[/dim]")
-
-            return output_path, cost
+            return image_data, cost
 
         except Exception as e:
             console.print(f"[red][X] Error generando imagen base: {e}[/red]")
@@ -231,13 +368,11 @@ Generate a single promotional image following these requirements."""
         Returns:
             Tuple de (path a imagen generada, costo en USD)
         """
-        console.print(
-            "\n[blue][DirectGen][/blue] Generando escena + producto (una sola llamada)..."
-        )
-        console.print(f"[dim]   Producto: {product_ref.name}[/dim]")
-        console.print(f"[dim]   Escena: {scene_ref.name}[/dim]")
+        _progress("Generando escena + producto (una sola llamada)...")
+        _progress(f"Producto: {product_ref.name}")
+        _progress(f"Escena: {scene_ref.name}")
         if angle_hint:
-            console.print(f"[dim]   Angulo: {angle_hint}[/dim]")
+            _progress(f"Angulo: {angle_hint}")
 
         style_instructions = ""
         if style_guide:
@@ -252,22 +387,9 @@ PRODUCT ANGLE & COMPOSITION: {angle_hint}
 Place the product according to this direction to create variation across a campaign.
 """
 
-        main_prompt = f"""You are a professional advertising photographer and art director.
-
-TASK: Create ONE image that combines:
-1. The SCENE REFERENCE as the background, environment, lighting, and mood. Use that image as the exact visual reference for the setting.
-2. An EXACT REPLICA of the PRODUCT from the product reference. The product must be a precise replica: same shape, colors, labels, brand, packaging, every detail. Place it naturally in the scene.
-
-{style_instructions}{angle_instructions}
-
-CRITICAL REQUIREMENTS:
-1. PRODUCT: The product must be an exact replica of the product reference image - do not modify, reinterpret, or stylize it. Same shape, colors, labels, brand, every detail.
-2. SCENE: Match the background, lighting, atmosphere, and mood from the scene reference. The product should look like it belongs in that environment.
-3. NO TEXT: Do NOT add any text, prices, headlines, or typography. Text will be added in a separate step.
-4. Leave clear space for text overlay (approximately top 20% or bottom 25% of the image).
-5. Professional quality: sharp focus on product, cohesive lighting.
-
-Generate a single promotional image following these requirements."""
+        main_prompt = _SCENE_PROMPT.substitute(
+            style_instructions=style_instructions, angle_instructions=angle_instructions
+        )
 
         content_parts = [
             {"type": "input_text", "text": main_prompt},
@@ -277,7 +399,7 @@ Generate a single promotional image following these requirements."""
             },
             {
                 "type": "input_image",
-                "image_url": f"data:{get_media_type(product_ref)};base64,{load_image_as_base64(product_ref)}",
+                "image_url": load_image_data_url(product_ref),
             },
             {
                 "type": "input_text",
@@ -285,11 +407,11 @@ Generate a single promotional image following these requirements."""
             },
             {
                 "type": "input_image",
-                "image_url": f"data:{get_media_type(scene_ref)};base64,{load_image_as_base64(scene_ref)}",
+                "image_url": load_image_data_url(scene_ref),
             },
         ]
 
-        console.print("[dim]   Generando con Responses API...[/dim]")
+        _progress("Generando con Responses API...")
 
         try:
             response = self.client.responses.create(
@@ -311,13 +433,13 @@ Generate a single promotional image following these requirements."""
                 output_path = Path("outputs") / "refs" / "scene_with_product.png"
 
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(base64.b64decode(image_data))
+            output_path.write_bytes(base64.b64decode(image_data))
 
             cost = COST_PER_IMAGE.get(self.model, 0.08)
-            self.cost_accumulated += cost
+            with self._cost_lock:
+                self.cost_accumulated += cost
             console.print(f"[green][OK][/green] Escena + producto generados: {output_path}")
-            console.print(f"[dim]   Costo: ${cost:.4f}[/dim]")
+            _progress(f"Costo: ${cost:.4f}")
             return output_path, cost
 
         except Exception as e:
@@ -334,6 +456,7 @@ Generate a single promotional image following these requirements."""
         show_price: bool = False,
         output_path: Path | None = None,
         font_ref: Path | None = None,
+        base_image_b64: str | None = None,
     ) -> tuple[Path, float]:
         """Agrega texto profesional a la imagen base usando AI.
 
@@ -349,30 +472,19 @@ Generate a single promotional image following these requirements."""
             show_price: Si mostrar el precio (actualmente no se agrega precio en este flujo)
             output_path: Dónde guardar la imagen final
             font_ref: Imagen de referencia de tipografía (opcional)
+            base_image_b64: PNG base ya en memoria (base64); si se pasa, no se lee `base_image`
 
         Returns:
             Tuple de (path a imagen final, costo en USD)
         """
-        console.print("\n[blue][DirectGen][/blue] Agregando texto profesional...")
-        console.print(f"[dim]   Headline: {headline}[/dim]")
-        console.print(f"[dim]   Producto: {product.name}[/dim]")
+        _progress("Agregando texto profesional...")
+        _progress(f"Headline: {headline}")
+        _progress(f"Producto: {product.name}")
         if font_ref:
-            console.print(f"[dim]   Fuente ref: {font_ref.name}[/dim]")
+            _progress(f"Fuente ref: {font_ref.name}")
 
         # Construir prompt para overlay de texto
         # Nota: este flujo no agrega precio; show_price se mantiene solo por compatibilidad.
-        typography_guide = f"""
-TYPOGRAPHY REQUIREMENTS:
-- Headline font style: {style_guide.typography.headline_style} (bold, impactful)
-- Headline color: {style_guide.typography.headline_color}
-- Headline position: {style_guide.typography.headline_position}
-- Text should have subtle shadow or outline for readability
-- Professional marketing typography - clean, modern, high contrast"""
-
-        font_ref_instruction = ""
-        if font_ref and font_ref.exists():
-            font_ref_instruction = """
-REFERENCE IMAGE (SOURCE): Use it ONLY for style. Replicate the typography look (font, weight, character) from that image. Do NOT copy the words shown in the reference. Write ONLY the exact texts we give you below (headline, subheadline). Same visual style as the reference — our content."""
 
         subheadline_instruction = ""
         if subheadline:
@@ -382,29 +494,17 @@ SUBHEADLINE (exact text, in the reference style):
 - Smaller than headline, same typography style as the reference image
 - Position below or near the headline"""
 
-        edit_prompt = f"""You are a professional graphic designer. Add text to the image using the SOURCE REFERENCE image for style only.
-
-RULES:
-1. SOURCE REFERENCE (the reference image): Take the typography STYLE from it — font, weight, look. Replicate that style. Do NOT copy the words written in that image.
-2. REPLICA: The letters must look like the reference (same font, same weight). The words must be exactly what we specify below — our headline and our subheadline.
-3. Write ONLY these exact texts (nothing else):
-
-HEADLINE (once only): "{headline}"
-{subheadline_instruction}
-
-CRITICAL:
-- Style from reference image; content from us. No extra text, no "SUPER Descuento", no repeated headline, no text from the reference image.
-- Do NOT add any price, price badge, currency, or monetary amount to the image.
-- Do not modify product or background. High contrast, readable."""
+        edit_prompt = _EDIT_PROMPT.substitute(
+            headline=headline, subheadline_instruction=subheadline_instruction
+        )
 
         content_parts = [
             {"type": "input_text", "text": edit_prompt},
         ]
 
         # Agregar referencia de fuente si existe (antes de la imagen base para que el modelo la vea como estilo)
-        if font_ref and font_ref.exists():
-            font_b64 = load_image_as_base64(font_ref)
-            font_media = get_media_type(font_ref)
+        font_url = _style_ref_data_url(font_ref) if font_ref else None
+        if font_url:
             content_parts.append(
                 {
                     "type": "input_text",
@@ -412,12 +512,18 @@ CRITICAL:
                 }
             )
             content_parts.append(
-                {"type": "input_image", "image_url": f"data:{font_media};base64,{font_b64}"}
+                {
+                    "type": "input_image",
+                    "image_url": font_url,
+                }
             )
 
-        # Agregar imagen base para editar
-        base_b64 = load_image_as_base64(base_image)
-        base_media = get_media_type(base_image)
+        # Agregar imagen base para editar (recién generada: no pasa por el cache)
+        if base_image_b64:
+            base_b64, base_media = base_image_b64, "image/png"
+        else:
+            base_b64 = load_image_as_base64(base_image)
+            base_media = get_media_type(base_image)
         content_parts.append(
             {
                 "type": "input_text",
@@ -429,7 +535,7 @@ CRITICAL:
         )
 
         # Llamar a Responses API para editar
-        console.print("[dim]   Generando texto con AI...[/dim]")
+        _progress("Generando texto con AI...")
 
         try:
             response = self.client.responses.create(
@@ -459,15 +565,14 @@ CRITICAL:
 
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            image_bytes = base64.b64decode(image_data)
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
+            output_path.write_bytes(base64.b64decode(image_data))
 
             cost = COST_PER_IMAGE.get(self.model, 0.08)
-            self.cost_accumulated += cost
+            with self._cost_lock:
+                self.cost_accumulated += cost
 
             console.print(f"[green][OK][/green] Texto agregado: {output_path}")
-            console.print(f"[dim]   Costo: ${cost:.4f}[/dim]")
+            _progress(f"Costo: ${cost:.4f}")
 
             return output_path, cost
 
@@ -487,6 +592,7 @@ CRITICAL:
         show_price: bool = True,
         output_dir: Path | None = None,
         variant_number: int = 1,
+        persist_base: bool = False,
     ) -> tuple[Path, float]:
         """Genera imagen completa en 2 pasos: base + texto.
 
@@ -501,26 +607,26 @@ CRITICAL:
             show_price: Mostrar precio
             output_dir: Directorio de salida
             variant_number: Número de variante
+            persist_base: Guardar también la imagen base sin texto (debug)
 
         Returns:
             Tuple de (path a imagen final, costo total)
         """
-        console.print(f"\n[bold cyan]═══ Generando imagen {variant_number} ═══[/bold cyan]")
+        _progress(f"Generando imagen {variant_number}")
 
         if output_dir is None:
             output_dir = Path("outputs") / "direct"
 
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Paso 1: Imagen base
+        # Paso 1: Imagen base (queda en memoria; solo se escribe con persist_base)
         base_path = output_dir / f"{product.name}_v{variant_number}_base.png"
-        base_path, cost1 = self.generate_base_image(
-            product_image=product_image,
-            style_refs=style_refs,
-            scene_prompt=scene_prompt,
-            style_guide=style_guide,
-            output_path=base_path,
+        base_b64, cost1 = self._base_image_payload(
+            product_image, style_refs, scene_prompt, style_guide, "1024x1536"
         )
+        if persist_base:
+            base_path.write_bytes(base64.b64decode(base_b64))
+            _progress(f"Base: {base_path}")
 
         # Paso 2: Agregar texto
         final_path = output_dir / f"{product.name}_v{variant_number}.png"
@@ -532,13 +638,14 @@ CRITICAL:
             subheadline=subheadline,
             show_price=show_price,
             output_path=final_path,
+            base_image_b64=base_b64,
         )
 
         total_cost = cost1 + cost2
-        console.print("\n[bold green][OK] Imagen completa generada[/bold green]")
-        console.print(f"[dim]   Base: {base_path}[/dim]")
-        console.print(f"[dim]   Final: {final_path}[/dim]")
-        console.print(f"[dim]   Costo total: ${total_cost:.4f}[/dim]")
+        console.print(
+            f"[green][OK][/green] Imagen {variant_number} generada: {final_path} "
+            f"(${total_cost:.4f})"
+        )
 
         return final_path, total_cost
 
@@ -1,17 +1,243 @@
 """Servicio de composición con Inpainting - Integración realista del producto."""
 
-import base64
+import hashlib
 import io
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from PIL import Image, ImageDraw, ImageFilter
+try:
+    import pybase64 as _b64
+except ImportError:  # optional speedup (SIMD); same b64encode/b64decode API as stdlib
+    import base64 as _b64
+
+import httpx
+from openai import OpenAI
+from PIL import Image, ImageDraw, ImageFilter, ImageStat
 from rich.console import Console
 
+from .concurrency import map_bounded
+from .direct_generator import load_image_data_url
+
 if TYPE_CHECKING:
     from ..models.campaign_style import CampaignStyleGuide
 
 console = Console()
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    """Cliente HTTP compartido para bajar imágenes por URL (keep-alive entre llamadas)."""
+    return httpx.Client(timeout=60.0, follow_redirects=True)
+
+
+def _download(url: str) -> bytes:
+    """Descarga una imagen generada; falla con HTTPStatusError si la URL no responde 2xx."""
+    response = _http_client().get(url)
+    response.raise_for_status()
+    return response.content
+
+
+def _open_image(data: bytes, mode: str) -> Image.Image:
+    """Abre una imagen en memoria en `mode`; convierte solo si viene en otro modo.
+
+    `convert()` siempre copia el buffer completo, aunque el modo ya coincida.
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.mode != mode:
+        return img.convert(mode)
+    img.load()
+    return img
+
+
+# Límite de OpenAI por imagen subida; las referencias más grandes se reducen antes
+MAX_UPLOAD_BYTES = 4_000_000
+_PRODUCT_MAX_EDGE = 2048
+
+
+def _png_bytes(img: Image.Image) -> bytes:
+    """Codifica una imagen PIL como PNG en memoria.
+
+    Solo para payloads que se suben y se descartan: compresión mínima, zlib rápido.
+    Si así supera MAX_UPLOAD_BYTES se recodifica con compresión máxima (sin pérdida
+    ni cambio de tamaño: escena y máscara tienen que seguir alineadas).
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=1)
+    if buffer.tell() > MAX_UPLOAD_BYTES:
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", compress_level=9)
+    return buffer.getvalue()
+
+
+def _product_upload_jpeg(path: Path) -> bytes:
+    """Recodifica una foto de producto como JPEG que entre en MAX_UPLOAD_BYTES.
+
+    Lado mayor hasta _PRODUCT_MAX_EDGE; si el JPEG igual supera el límite se sigue
+    reduciendo. La transparencia se aplana sobre blanco.
+    """
+    with Image.open(path) as img:
+        rgba = img.convert("RGBA")
+    flat = Image.new("RGB", rgba.size, "white")
+    flat.paste(rgba, mask=rgba.getchannel("A"))
+    max_edge = _PRODUCT_MAX_EDGE
+    while True:
+        if max(flat.size) > max_edge:
+            flat.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        flat.save(buffer, format="JPEG", quality=85, optimize=True)
+        if buffer.tell() <= MAX_UPLOAD_BYTES or max_edge <= 256:
+            return buffer.getvalue()
+        max_edge = int(max(flat.size) * 0.75)
+
+
+# Tamaños que aceptan los modelos gpt-image (ancho, alto)
+_API_SIZES = ((1024, 1024), (1024, 1536), (1536, 1024))
+
+
+def _api_size(width: int, height: int) -> str:
+    """Tamaño de la API con la proporción más cercana a la escena (vertical/cuadrada/apaisada)."""
+    w, h = min(_API_SIZES, key=lambda s: abs(width / height - s[0] / s[1]))
+    return f"{w}x{h}"
+
+
+def _feather(channel: Image.Image, radius: float) -> Image.Image:
+    """Difumina un canal L como un GaussianBlur(radius), bastante más barato.
+
+    El borde difuminado no necesita resolución completa: se trabaja a 1/4 de lado
+    (16x menos píxeles) con 3 pasadas de box blur, que aproximan la gaussiana con
+    costo independiente del radio, y se vuelve a escalar con interpolación bilineal.
+    """
+    width, height = channel.size
+    small = channel.resize((max(1, width // 4), max(1, height // 4)), Image.Resampling.BILINEAR)
+    # 3 box blur de radio r tienen varianza ((2r+1)^2 - 1) / 4 = sigma^2
+    sigma = radius / 4
+    box_radius = ((4 * sigma * sigma + 1) ** 0.5 - 1) / 2
+    for _ in range(3):
+        small = small.filter(ImageFilter.BoxBlur(box_radius))
+    return small.resize((width, height), Image.Resampling.BILINEAR)
+
+
+# Cache en disco de resultados de inpainting (opt-in con CM_INPAINT_CACHE=1)
+INPAINT_CACHE_DIR = Path.home() / ".cache" / "cm-agents" / "inpaint"
+INPAINT_CACHE_MAX_BYTES = 2 * 1024**3
+# Marca en `Image.info` de los resultados de `_fallback_inpaint`
+FALLBACK_INFO_KEY = "cm_inpaint_fallback"
+
+
+def _save_intermediate_enabled() -> bool:
+    return os.getenv("CM_SAVE_INTERMEDIATE", "").strip() == "1"
+
+
+@lru_cache(maxsize=1)
+def _debug_writer() -> ThreadPoolExecutor:
+    """Pool de fondo para escrituras de debug que no deben frenar la generación."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="cm-debug-save")
+
+
+def _log_failed_save(future: Future) -> None:
+    """Callback de `_debug_writer`: los errores de disco/encode no se pierden en silencio."""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning("No se pudo guardar la imagen intermedia: %s", error)
+
+
+def _inpaint_cache_enabled() -> bool:
+    return os.getenv("CM_INPAINT_CACHE", "").strip() == "1"
+
+
+def _inpaint_cache_key(product_photo: Path, *parts: object) -> str:
+    """Hash de la foto del producto + parámetros (prompt con espacios normalizados)."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(product_photo.read_bytes())
+    for part in parts:
+        text = " ".join(part.split()) if isinstance(part, str) else repr(part)
+        digest.update(b"\x00" + text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _prune_inpaint_cache(cache_dir: Path, max_bytes: int = INPAINT_CACHE_MAX_BYTES) -> None:
+    """Borra las entradas usadas hace más tiempo hasta quedar bajo `max_bytes`."""
+    # Otros jobs del batch podan el mismo directorio a la vez: una entrada puede
+    # desaparecer entre el glob y el stat, y eso no debe fallar la generación
+    entries = []
+    for path in cache_dir.glob("*.png"):
+        with suppress(FileNotFoundError):
+            entries.append((path, path.stat()))
+    total = sum(st.st_size for _, st in entries)
+    for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+        if total <= max_bytes:
+            break
+        with suppress(FileNotFoundError):
+            path.unlink()
+        total -= st.st_size
+
+
+# file_ids de imágenes ya subidas a /files (opt-in con CM_INPAINT_FILE_UPLOAD=1),
+# por hash de contenido; LRU acotado
+_uploaded_files: OrderedDict[str, str] = OrderedDict()
+_uploaded_files_lock = threading.Lock()
+_UPLOADED_FILES_MAX = 256
+
+
+def _file_upload_enabled() -> bool:
+    return os.getenv("CM_INPAINT_FILE_UPLOAD", "").strip() == "1"
+
+
+# Último modelo de chat que funcionó, por API key: evita reprobar en cada llamada
+# modelos que esa cuenta no tiene habilitados (403 / not supported)
+CHAT_MODEL_PREFS_PATH = Path.home() / ".cache" / "cm-agents" / "inpaint_model.json"
+_chat_model_prefs: dict[str, str] | None = None
+_chat_model_prefs_lock = threading.Lock()
+
+
+def _api_key_id() -> str:
+    return hashlib.sha256(os.getenv("OPENAI_API_KEY", "").encode()).hexdigest()[:16]
+
+
+def _chat_model_prefs_locked() -> dict[str, str]:
+    """Preferencias en memoria; el archivo se lee una sola vez por proceso."""
+    global _chat_model_prefs
+    if _chat_model_prefs is None:
+        try:
+            _chat_model_prefs = json.loads(CHAT_MODEL_PREFS_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _chat_model_prefs = {}
+    return _chat_model_prefs
+
+
+def _preferred_chat_model() -> str | None:
+    with _chat_model_prefs_lock:
+        return _chat_model_prefs_locked().get(_api_key_id())
+
+
+def _remember_chat_model(chat_model: str) -> None:
+    """Guarda `chat_model` como preferido (escritura atómica, solo si cambió)."""
+    key = _api_key_id()
+    with _chat_model_prefs_lock:
+        prefs = _chat_model_prefs_locked()
+        if prefs.get(key) == chat_model:
+            return
+        prefs[key] = chat_model
+        try:
+            CHAT_MODEL_PREFS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = CHAT_MODEL_PREFS_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(prefs), encoding="utf-8")
+            os.replace(tmp, CHAT_MODEL_PREFS_PATH)
+        except OSError as e:
+            console.print(f"[dim]   No se pudo guardar el modelo preferido: {e}[/dim]")
 
 
 class InpaintingCompositor:
@@ -31,8 +257,6 @@ class InpaintingCompositor:
     """
 
     def __init__(self, model: str = "gpt-image-1.5"):
-        from openai import OpenAI
-
         self.client = OpenAI()
         self.model = model
 
@@ -59,6 +283,21 @@ class InpaintingCompositor:
         Returns:
             Imagen RGBA donde transparente = preservar, blanco = editar
         """
+        # Las variantes de una campaña repiten tamaño y parámetros: la máscara se
+        # rasteriza una vez y se devuelve una copia (el llamador puede modificarla)
+        return self._draw_product_mask(
+            tuple(image_size), position, product_scale, shape, feather
+        ).copy()
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _draw_product_mask(
+        image_size: tuple[int, int],
+        position: str,
+        product_scale: float,
+        shape: str,
+        feather: int,
+    ) -> Image.Image:
         width, height = image_size
 
         # Calcular dimensiones del área del producto
@@ -87,19 +326,18 @@ class InpaintingCompositor:
             x = (width - mask_width) // 2
             y = (height - mask_height) // 2
 
-        # Crear máscara base (transparente = preservar)
-        mask = Image.new("RGBA", image_size, (0, 0, 0, 255))
-        draw = ImageDraw.Draw(mask)
+        # La forma se dibuja en un solo canal L (1/4 del ancho de banda de RGBA) y se
+        # replica en RGB al final: el endpoint de edición exige máscara con alfa
+        shape_l = Image.new("L", image_size, 0)
+        draw = ImageDraw.Draw(shape_l)
 
         # Dibujar área de edición (blanco)
         if shape == "ellipse":
-            draw.ellipse([x, y, x + mask_width, y + mask_height], fill=(255, 255, 255, 255))
+            draw.ellipse([x, y, x + mask_width, y + mask_height], fill=255)
         elif shape == "rectangle":
             # Rectángulo con esquinas redondeadas
             radius = min(mask_width, mask_height) // 8
-            draw.rounded_rectangle(
-                [x, y, x + mask_width, y + mask_height], radius=radius, fill=(255, 255, 255, 255)
-            )
+            draw.rounded_rectangle([x, y, x + mask_width, y + mask_height], radius=radius, fill=255)
         elif shape == "bottle":
             # Forma de botella: elipse arriba + rectángulo abajo
             neck_width = mask_width // 3
@@ -107,23 +345,18 @@ class InpaintingCompositor:
 
             # Cuello
             neck_x = x + (mask_width - neck_width) // 2
-            draw.ellipse(
-                [neck_x, y, neck_x + neck_width, y + neck_height], fill=(255, 255, 255, 255)
-            )
+            draw.ellipse([neck_x, y, neck_x + neck_width, y + neck_height], fill=255)
             # Cuerpo
-            draw.ellipse(
-                [x, y + neck_height - 20, x + mask_width, y + mask_height],
-                fill=(255, 255, 255, 255),
-            )
+            draw.ellipse([x, y + neck_height - 20, x + mask_width, y + mask_height], fill=255)
 
-        # Aplicar feather (difuminado) para transición suave
+        # Aplicar feather (difuminado) al área de edición para transición suave.
+        # Se difumina la forma, no el alfa: el alfa es 255 constante y difuminarlo
+        # no cambiaba nada.
         if feather > 0:
-            # Convertir a escala de grises para blur
-            alpha = mask.split()[3]
-            alpha = alpha.filter(ImageFilter.GaussianBlur(radius=feather))
-            mask.putalpha(alpha)
+            shape_l = _feather(shape_l, feather)
 
-        return mask
+        alpha = Image.new("L", image_size, 255)
+        return Image.merge("RGBA", (shape_l, shape_l, shape_l, alpha))
 
     def generate_scene_with_placeholder(
         self,
@@ -172,16 +405,13 @@ Do NOT put any object in this reserved space - it should be a natural-looking em
 
             # Obtener imagen
             if result.data[0].b64_json:
-                image_bytes = base64.b64decode(result.data[0].b64_json)
+                image_bytes = _b64.b64decode(result.data[0].b64_json)
             elif result.data[0].url:
-                import httpx
-
-                response = httpx.get(result.data[0].url)
-                image_bytes = response.content
+                image_bytes = _download(result.data[0].url)
             else:
                 raise ValueError("No se recibió imagen")
 
-            scene = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+            scene = _open_image(image_bytes, "RGBA")
 
             # Crear máscara correspondiente
             mask = self.create_product_mask(
@@ -228,19 +458,29 @@ Do NOT put any object in this reserved space - it should be a natural-looking em
         if isinstance(mask, Path):
             mask = Image.open(mask).convert("RGBA")
 
-        # Convertir imágenes a base64
-        def image_to_base64(img: Image.Image) -> str:
-            buffer = io.BytesIO()
-            img.save(buffer, format="PNG")
-            return base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-        def path_to_base64(path: Path) -> str:
-            with open(path, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
-
-        scene_b64 = image_to_base64(scene)
-        mask_b64 = image_to_base64(mask)
-        product_b64 = path_to_base64(product_reference)
+        # Codificar una sola vez: se reusa en cada modelo de chat y en el fallback
+        size = _api_size(*scene.size)
+        scene_png = _png_bytes(scene)
+        mask_png = _png_bytes(mask)
+        scene_input = self._file_input(scene_png, "scene.png") or {
+            "image_url": f"data:image/png;base64,{_b64.b64encode(scene_png).decode('utf-8')}"
+        }
+        mask_input = self._file_input(mask_png, "mask.png") or {
+            "image_url": f"data:image/png;base64,{_b64.b64encode(mask_png).decode('utf-8')}"
+        }
+        product_url: str | None = None
+        product_image: bytes | Path = product_reference
+        product_name = product_reference.name
+        if product_reference.stat().st_size > MAX_UPLOAD_BYTES:
+            # Foto de celular de varios MB: se rechazaría tras subirla entera
+            console.print("[yellow][!] Producto reducido para cumplir límite 4MB[/yellow]")
+            # Siempre se recodifica: un PNG de <=2048px también puede pasar de 4MB
+            product_image = _product_upload_jpeg(product_reference)
+            product_url = f"data:image/jpeg;base64,{_b64.b64encode(product_image).decode('utf-8')}"
+            product_name = f"{product_reference.stem}.jpg"
+        product_input = self._file_input(product_image, product_name) or {
+            "image_url": product_url or load_image_data_url(product_reference)
+        }
 
         # Prompt detallado para inpainting con referencia de producto
         inpaint_prompt = f"""
@@ -274,71 +514,65 @@ Paint the product NOW in the masked area.
                     "type": "input_text",
                     "text": "SCENE IMAGE (paint the product in the empty area):",
                 },
-                {
-                    "type": "input_image",
-                    "image_url": f"data:image/png;base64,{scene_b64}",
-                },
+                {"type": "input_image", **scene_input},
                 {"type": "input_text", "text": "PRODUCT REFERENCE (copy this EXACT product):"},
-                {
-                    "type": "input_image",
-                    "image_url": f"data:image/png;base64,{product_b64}",
-                },
+                {"type": "input_image", **product_input},
             ]
 
-            # Determinar tamaño
-            size = "1024x1536" if scene.height > scene.width else "1024x1024"
-            if scene.width == scene.height:
-                size = "1024x1024"
-
-            # Intentar con diferentes modelos de chat
+            # Intentar con diferentes modelos de chat; primero el último que funcionó
             chat_models = ["gpt-4o-mini", "gpt-4-turbo", "gpt-4"]
-            response = None
-
-            for chat_model in chat_models:
+            preferred = _preferred_chat_model()
+            if preferred in chat_models:
+                chat_models.remove(preferred)
+                chat_models.insert(0, preferred)
+            image_tool = {
+                "type": "image_generation",
+                "model": self.model,
+                "size": size,
+                "quality": quality if quality != "auto" else "medium",
+            }
+
+            def _request(chat_model: str):
+                """Respuesta con `chat_model`; None si el modelo no está disponible."""
                 try:
                     console.print(f"[dim]   Usando {chat_model} + {self.model}...[/dim]")
-                    response = self.client.responses.create(
+                    return self.client.responses.create(
                         model=chat_model,
                         input=[{"role": "user", "content": content_parts}],
-                        tools=[
-                            {
-                                "type": "image_generation",
-                                "model": self.model,
-                                "size": size,
-                                "quality": quality if quality != "auto" else "medium",
-                                "input_image_mask": {
-                                    "image_url": f"data:image/png;base64,{mask_b64}",
-                                },
-                            }
-                        ],
+                        tools=[{**image_tool, "input_image_mask": mask_input}],
                     )
-                    break
                 except Exception as e:
                     error_str = str(e).lower()
                     if "403" in error_str or "not supported" in error_str:
-                        continue
+                        return None
                     # Si el error es por input_image_mask, intentar sin máscara
                     if "mask" in error_str:
                         console.print(
                             "[yellow][!] Máscara no soportada, usando generación directa[/yellow]"
                         )
-                        response = self.client.responses.create(
+                        return self.client.responses.create(
                             model=chat_model,
                             input=[{"role": "user", "content": content_parts}],
-                            tools=[
-                                {
-                                    "type": "image_generation",
-                                    "model": self.model,
-                                    "size": size,
-                                    "quality": quality if quality != "auto" else "medium",
-                                }
-                            ],
+                            tools=[image_tool],
                         )
-                        break
                     raise
 
-            if response is None:
+            response = None
+            winner: str | None = None
+            if os.getenv("CM_SPECULATIVE_INPAINT", "").strip() == "1":
+                winner, response = self._first_response(_request, chat_models)
+            else:
+                for chat_model in chat_models:
+                    response = _request(chat_model)
+                    if response is not None:
+                        winner = chat_model
+                        break
+
+            if response is None or winner is None:
                 raise ValueError("No se pudo generar con ningún modelo de chat")
+            # Solo el modelo cuya respuesta se usa: en modo especulativo los demás
+            # requests siguen corriendo y no deben pisar la preferencia
+            _remember_chat_model(winner)
 
             # Extraer imagen generada
             image_data = [
@@ -350,8 +584,8 @@ Paint the product NOW in the masked area.
             if not image_data:
                 raise ValueError("No se generó imagen en la respuesta")
 
-            image_bytes = base64.b64decode(image_data[0])
-            final = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            image_bytes = _b64.b64decode(image_data[0])
+            final = _open_image(image_bytes, "RGB")
             console.print("[green][OK][/green] Producto integrado")
             return final
 
@@ -359,26 +593,89 @@ Paint the product NOW in the masked area.
             console.print(f"[red][X] Error en inpainting:[/red] {e}")
             # Fallback: usar Image Edit API simple
             console.print("[yellow][!] Intentando fallback con Image Edit API...[/yellow]")
-            return self._fallback_inpaint(scene, mask, product_description)
+            return self._fallback_inpaint(
+                scene,
+                mask,
+                product_description,
+                scene_png=scene_png,
+                mask_png=mask_png,
+                size=size,
+            )
+
+    def _file_input(self, image: bytes | Path, filename: str) -> dict[str, str] | None:
+        """Referencia `{"file_id": ...}` a una imagen subida a /files.
+
+        Con `CM_INPAINT_FILE_UPLOAD=1` cada imagen se sube una sola vez (por
+        contenido): la foto del producto se reusa entre días de la campaña y escena
+        y máscara entre modelos de chat, sin reenviar ~33% extra de base64 en cada
+        request. None si está desactivado o la subida falla (se envía inline).
+        """
+        if not _file_upload_enabled():
+            return None
+        data = image.read_bytes() if isinstance(image, Path) else image
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with _uploaded_files_lock:
+            file_id = _uploaded_files.get(key)
+            if file_id is not None:
+                _uploaded_files.move_to_end(key)
+                return {"file_id": file_id}
+
+        try:
+            file_id = self.client.files.create(file=(filename, data), purpose="vision").id
+        except Exception as e:
+            console.print(f"[yellow][!] No se pudo subir {filename}, se envía inline:[/yellow] {e}")
+            return None
+
+        with _uploaded_files_lock:
+            _uploaded_files[key] = file_id
+            if len(_uploaded_files) > _UPLOADED_FILES_MAX:
+                _uploaded_files.popitem(last=False)
+        return {"file_id": file_id}
+
+    @staticmethod
+    def _first_response(
+        attempt: Callable[[str], Any], chat_models: list[str]
+    ) -> tuple[str | None, Any]:
+        """Lanza todos los modelos de chat a la vez; devuelve (modelo, respuesta) del primero.
+
+        Modo especulativo (`CM_SPECULATIVE_INPAINT=1`): si el modelo preferido no
+        está disponible no se paga su latencia antes de probar el siguiente, a
+        cambio de que los requests ya enviados se completen (y se facturen) igual.
+        """
+        executor = ThreadPoolExecutor(max_workers=len(chat_models))
+        futures = {executor.submit(attempt, chat_model): chat_model for chat_model in chat_models}
+        first_error: Exception | None = None
+        try:
+            for future in as_completed(futures):
+                try:
+                    response = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    continue
+                if response is not None:
+                    return futures[future], response
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if first_error is not None:
+            raise first_error
+        return None, None
 
     def _fallback_inpaint(
         self,
         scene: Image.Image,
         mask: Image.Image,
         product_description: str,
+        scene_png: bytes | None = None,
+        mask_png: bytes | None = None,
+        size: str | None = None,
     ) -> Image.Image:
         """Fallback usando Image Edit API sin referencia de producto.
 
-        Menos preciso pero más compatible.
+        Menos preciso pero más compatible. `scene_png`/`mask_png`/`size` permiten
+        reusar lo ya calculado por `inpaint_product`.
         """
-
-        def image_to_bytes(img: Image.Image) -> bytes:
-            buffer = io.BytesIO()
-            img.save(buffer, format="PNG")
-            return buffer.getvalue()
-
-        scene_bytes = image_to_bytes(scene)
-        mask_bytes = image_to_bytes(mask)
+        scene_bytes = scene_png or _png_bytes(scene)
+        mask_bytes = mask_png or _png_bytes(mask)
 
         prompt = f"""
 Paint this product in the masked area: {product_description}
@@ -390,10 +687,7 @@ Requirements:
 - The product should look like it belongs in this scene
 """
 
-        # Determinar tamaño
-        size = "1024x1536" if scene.height > scene.width else "1024x1024"
-        if scene.width == scene.height:
-            size = "1024x1024"
+        size = size or _api_size(*scene.size)
 
         try:
             result = self.client.images.edit(
@@ -405,16 +699,16 @@ Requirements:
             )
 
             if result.data[0].b64_json:
-                image_bytes = base64.b64decode(result.data[0].b64_json)
+                image_bytes = _b64.b64decode(result.data[0].b64_json)
             elif result.data[0].url:
-                import httpx
-
-                response = httpx.get(result.data[0].url)
-                image_bytes = response.content
+                image_bytes = _download(result.data[0].url)
             else:
                 raise ValueError("No image returned")
 
-            return Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            final = _open_image(image_bytes, "RGB")
+            # Resultado degradado: generate_with_inpainting no lo guarda en cache
+            final.info[FALLBACK_INFO_KEY] = True
+            return final
 
         except Exception as e:
             console.print(f"[red][X] Fallback también falló:[/red] {e}")
@@ -450,6 +744,26 @@ Requirements:
         console.print(f"[dim]   Producto: {product_photo.name}[/dim]")
         console.print(f"[dim]   Posición: {position}[/dim]")
 
+        cached: Path | None = None
+        if _inpaint_cache_enabled():
+            key = _inpaint_cache_key(
+                product_photo,
+                scene_prompt,
+                product_description,
+                self.model,
+                size,
+                position,
+                product_scale,
+                quality,
+            )
+            cached = INPAINT_CACHE_DIR / f"{key}.png"
+            if cached.exists():
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(cached, output_path)
+                os.utime(cached)  # LRU: marcar como usado
+                console.print(f"[bold green][OK][/bold green] Desde cache: {output_path}")
+                return output_path, 0.0
+
         # 1. Generar escena con placeholder
         scene, mask = self.generate_scene_with_placeholder(
             prompt=scene_prompt,
@@ -458,9 +772,14 @@ Requirements:
             product_scale=product_scale,
         )
 
-        # Guardar escena intermedia (para debug)
-        scene_path = output_path.parent / f"_scene_{output_path.stem}.png"
-        scene.save(scene_path)
+        # Guardar escena intermedia (solo debug, CM_SAVE_INTERMEDIATE=1): en segundo
+        # plano y con compresión mínima, en paralelo a la llamada de inpainting
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if _save_intermediate_enabled():
+            scene_path = output_path.parent / f"_scene_{output_path.stem}.png"
+            _debug_writer().submit(
+                scene.save, scene_path, optimize=False, compress_level=1
+            ).add_done_callback(_log_failed_save)
 
         # 2. Inpaint producto
         final = self.inpaint_product(
@@ -472,17 +791,53 @@ Requirements:
         )
 
         # 3. Guardar resultado
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        final.save(output_path, "PNG", quality=95)
+        final.save(output_path, "PNG", compress_level=9, optimize=True)
 
         # Costo estimado (2 generaciones: escena + inpaint)
         cost = 0.06 * 2  # gpt-image-1.5 ~$0.06 por imagen
 
+        # Solo se cachea el camino principal: un fallo transitorio de la API no debe
+        # fijar para siempre el resultado del fallback para esta clave
+        if cached is not None and not final.info.get(FALLBACK_INFO_KEY):
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copyfile(output_path, tmp)
+            os.replace(tmp, cached)
+            _prune_inpaint_cache(cached.parent)
+
         console.print(f"[bold green][OK][/bold green] Guardado: {output_path}")
         console.print(f"[dim]   Costo estimado: ${cost:.3f}[/dim]")
 
         return output_path, cost
 
+    def generate_with_inpainting_batch(
+        self,
+        jobs: list[dict[str, Any]],
+        max_concurrent: int = 5,
+    ) -> list[tuple[Path | None, float, str | None]]:
+        """Ejecuta `generate_with_inpainting` para varios jobs en paralelo.
+
+        Cada job hace 2 llamadas secuenciales (escena -> inpaint); en paralelo la
+        escena de un job se genera mientras otro espera su inpaint.
+
+        Args:
+            jobs: kwargs de `generate_with_inpainting` por job
+            max_concurrent: Máximo de jobs simultáneos
+
+        Returns:
+            Lista alineada con `jobs` de (path final, costo, error); error es None
+            si el job se generó bien. Un job que falla no corta al resto.
+        """
+
+        def _run_one(job: dict[str, Any]) -> tuple[Path | None, float, str | None]:
+            try:
+                final_path, cost = self.generate_with_inpainting(**job)
+                return final_path, cost, None
+            except Exception as e:
+                return None, 0.0, str(e)
+
+        return map_bounded(_run_one, jobs, max_concurrent)
+
 
 class CascadeStyleManager:
     """Gestiona coherencia visual entre imágenes de una campaña.
@@ -491,12 +846,15 @@ class CascadeStyleManager:
     y la primera imagen generada como "ancla visual" para refuerzo.
     """
 
-    def __init__(self, style_guide: "CampaignStyleGuide | None" = None):
-        from ..models.campaign_style import CampaignStyleGuide
+    _SAMPLE_SIZE = (256, 256)
 
+    def __init__(self, style_guide: "CampaignStyleGuide | None" = None):
         self.style_guide: CampaignStyleGuide | None = style_guide
+        # Muestra reducida del anchor (<=256px): solo alimenta los tokens; la imagen
+        # completa, si hace falta como referencia, se lee de style_anchor_path.
         self.style_anchor: Image.Image | None = None
         self.style_anchor_path: Path | None = None
+        self._anchor_signature: tuple[str, int, int] | None = None  # (path, mtime, tamaño)
         self.extracted_tokens: dict = {}  # Tokens extraídos del anchor
         self.image_count: int = 0
 
@@ -513,16 +871,38 @@ class CascadeStyleManager:
         Las siguientes generaciones usarán esta imagen como referencia visual.
         """
         if isinstance(image, Path):
-            self.style_anchor = Image.open(image)
+            # Mismo archivo sin cambios: los tokens ya están calculados
+            st = image.stat()
+            signature = (str(image.resolve()), st.st_mtime_ns, st.st_size)
+            if signature == self._anchor_signature and self.style_anchor is not None:
+                return
+            with Image.open(image) as img:
+                # Reducir la imagen recién abierta, sin copia previa: en JPEG
+                # thumbnail() decodifica ya a escala reducida (draft de libjpeg)
+                img.thumbnail(self._SAMPLE_SIZE, Image.Resampling.NEAREST)
+                self.style_anchor = img.copy()
             self.style_anchor_path = image
+            self._anchor_signature = signature
         else:
-            self.style_anchor = image
+            self.style_anchor = self._sample(image)
             self.style_anchor_path = None
+            self._anchor_signature = None
 
         # Extraer tokens de estilo de la imagen
         self._extract_style_tokens()
         console.print("[blue][Style][/blue] Ancla visual establecida")
 
+    @staticmethod
+    def _sample(image: Image.Image) -> Image.Image:
+        """Copia reducida a <=256px para estadísticas de estilo.
+
+        Media y desvío no necesitan la imagen completa. NEAREST muestrea píxeles
+        sin promediarlos, así el desvío (contraste) no se suaviza.
+        """
+        sample = image.copy()
+        sample.thumbnail(CascadeStyleManager._SAMPLE_SIZE, Image.Resampling.NEAREST)
+        return sample
+
     def _extract_style_tokens(self) -> None:
         """Extrae tokens de estilo de la imagen anchor.
 
@@ -531,29 +911,28 @@ class CascadeStyleManager:
         if self.style_anchor is None:
             return
 
-        import numpy as np
-
-        # Convertir a numpy array
-        img_array = np.array(self.style_anchor)
+        # Extraer estadísticas de color (una pasada por histograma, en C)
+        if len(self.style_anchor.getbands()) >= 3:
+            stat = ImageStat.Stat(self.style_anchor)
 
-        # Extraer estadísticas de color
-        if len(img_array.shape) == 3:
             # Colores promedio
-            avg_colors = img_array.mean(axis=(0, 1))
-            self.extracted_tokens["avg_r"] = int(avg_colors[0])
-            self.extracted_tokens["avg_g"] = int(avg_colors[1])
-            self.extracted_tokens["avg_b"] = int(avg_colors[2])
+            avg_colors = stat.mean
+            r, g, b = avg_colors[:3]
+            self.extracted_tokens["avg_r"] = int(r)
+            self.extracted_tokens["avg_g"] = int(g)
+            self.extracted_tokens["avg_b"] = int(b)
 
             # Luminosidad promedio
-            luminance = 0.299 * avg_colors[0] + 0.587 * avg_colors[1] + 0.114 * avg_colors[2]
+            luminance = 0.299 * r + 0.587 * g + 0.114 * b
             self.extracted_tokens["luminance"] = "dark" if luminance < 128 else "bright"
 
-            # Contraste (desviación estándar)
-            std = img_array.std()
+            # Contraste (desviación estándar sobre todos los canales)
+            overall_mean = sum(avg_colors) / len(avg_colors)
+            mean_sq = sum(m * m + v for m, v in zip(avg_colors, stat.var)) / len(avg_colors)
+            std = max(mean_sq - overall_mean * overall_mean, 0.0) ** 0.5
             self.extracted_tokens["contrast"] = "high" if std > 50 else "low"
 
             # Saturación aproximada
-            r, g, b = avg_colors[0], avg_colors[1], avg_colors[2]
             max_c = max(r, g, b)
             min_c = min(r, g, b)
             saturation = (max_c - min_c) / max_c if max_c > 0 else 0
@@ -1,5 +1,6 @@
 """Variant Generator - Creates prompt variations for multiple design variants."""
 
+import itertools
 import random
 
 from ..models.generation import GenerationPrompt
@@ -56,28 +57,35 @@ class VariantStrategy:
         Returns:
             Modified GenerationPrompt with variations
         """
-        # Use variant_number as seed for consistency (same variant always gets same variation)
-        random.seed(variant_number)
+        # Local RNG seeded with variant_number: same variant always gets same variation,
+        # without reseeding the global `random` module (shared across threads)
+        rng = random.Random(variant_number)
 
         # Select variations
-        composition = random.choice(cls.COMPOSITION_VARIATIONS)
-        lighting = random.choice(cls.LIGHTING_VARIATIONS)
-        angle = random.choice(cls.ANGLE_VARIATIONS)
-        background = random.choice(cls.BACKGROUND_VARIATIONS)
+        variation = (
+            rng.choice(cls.COMPOSITION_VARIATIONS),
+            rng.choice(cls.LIGHTING_VARIATIONS),
+            rng.choice(cls.ANGLE_VARIATIONS),
+            rng.choice(cls.BACKGROUND_VARIATIONS),
+        )
+        return cls._apply_variation(base_prompt, variation)
 
+    @staticmethod
+    def _apply_variation(
+        base_prompt: GenerationPrompt, variation: tuple[str, ...]
+    ) -> GenerationPrompt:
+        """Append the (composition, lighting, angle, background) variation to a prompt."""
         # Build variation suffix
-        variation_text = f", {composition}, {lighting}, {angle}, {background}"
+        variation_text = ", " + ", ".join(variation)
 
         # Modify prompt
-        variant_prompt = GenerationPrompt(
+        return GenerationPrompt(
             prompt=base_prompt.prompt + variation_text,
             visual_description=base_prompt.visual_description,
             negative_prompt=base_prompt.negative_prompt,
             params=base_prompt.params,
         )
 
-        return variant_prompt
-
     @classmethod
     def create_diverse_variants(
         cls, base_prompt: GenerationPrompt, num_variants: int
@@ -85,6 +93,10 @@ class VariantStrategy:
         """
         Create diverse variants ensuring no duplicates.
 
+        All combinations are enumerated once and shuffled with a fixed seed, so the
+        first N are unique (and stable between runs) without retrying. Duplicates
+        only appear if more variants are requested than combinations exist.
+
         Args:
             base_prompt: Base prompt
             num_variants: Number of variants to create
@@ -92,29 +104,19 @@ class VariantStrategy:
         Returns:
             List of (variant_prompt, variation_type) tuples
         """
-        variants = []
-        used_combinations = set()
-
-        for i in range(1, num_variants + 1):
-            # Try to get unique combination
-            max_attempts = 50
-            for attempt in range(max_attempts):
-                variant = cls.create_variant_prompt(base_prompt, i + attempt * 1000, num_variants)
-                # Create signature from variation elements
-                sig = (
-                    variant.prompt[len(base_prompt.prompt) :]
-                    if len(variant.prompt) > len(base_prompt.prompt)
-                    else str(i)
-                )
-                if sig not in used_combinations:
-                    used_combinations.add(sig)
-                    variation_type = f"variant_{i}"
-                    variants.append((variant, variation_type))
-                    break
-            else:
-                # If we couldn't get unique, use the last one
-                variant = cls.create_variant_prompt(base_prompt, i, num_variants)
-                variation_type = f"variant_{i}"
-                variants.append((variant, variation_type))
-
-        return variants
+        combinations = list(
+            itertools.product(
+                cls.COMPOSITION_VARIATIONS,
+                cls.LIGHTING_VARIATIONS,
+                cls.ANGLE_VARIATIONS,
+                cls.BACKGROUND_VARIATIONS,
+            )
+        )
+        random.Random(0).shuffle(combinations)
+
+        return [
+            (cls._apply_variation(base_prompt, variation), f"variant_{i}")
+            for i, variation in enumerate(
+                itertools.islice(itertools.cycle(combinations), num_variants), start=1
+            )
+        ]
@@ -9,6 +9,7 @@ from __future__ import annotations
 import json
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -29,8 +30,36 @@ def _knowledge_path() -> Path:
     return base / "design_2026.json"
 
 
-def load_styles() -> dict[str, StyleInfo]:
+def _knowledge_key() -> tuple[str, int] | None:
+    """(resolved path, mtime_ns) of the knowledge file, or None if it is missing.
+
+    Caches are keyed on it: KNOWLEDGE_DIR and the JSON can change between calls.
+    """
     path = _knowledge_path()
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    return str(path.resolve()), mtime_ns
+
+
+def load_styles() -> dict[str, StyleInfo]:
+    key = _knowledge_key()
+    # Copy: callers get their own dict, the parsed one stays cached.
+    return dict(_load_styles_cached(*key)) if key else {}
+
+
+@lru_cache(maxsize=4)
+def _load_styles_cached(knowledge_path: str, mtime_ns: int) -> dict[str, StyleInfo]:
+    return _load_styles_from(Path(knowledge_path))
+
+
+@lru_cache(maxsize=4)
+def _style_keys_cached(knowledge_path: str, mtime_ns: int) -> tuple[str, ...]:
+    return tuple(sorted(_load_styles_cached(knowledge_path, mtime_ns)))
+
+
+def _load_styles_from(path: Path) -> dict[str, StyleInfo]:
     if not path.exists():
         return {}
     with open(path, encoding="utf-8") as f:
@@ -54,13 +83,19 @@ def load_styles() -> dict[str, StyleInfo]:
 
 
 def get_available_style_keys() -> list[str]:
-    return sorted(load_styles().keys())
+    key = _knowledge_key()
+    return list(_style_keys_cached(*key)) if key else []
 
 
 def build_visual_direction_from_style(style_key: str) -> str:
     """Returns a concise directive for CreativeEngine based on a style key."""
-    styles = load_styles()
-    s = styles.get(style_key)
+    key = _knowledge_key()
+    return _visual_direction_for(style_key, *key) if key else ""
+
+
+@lru_cache(maxsize=64)
+def _visual_direction_for(style_key: str, knowledge_path: str, mtime_ns: int) -> str:
+    s = _load_styles_cached(knowledge_path, mtime_ns).get(style_key)
     if not s:
         return ""
     parts: list[str] = []
@@ -61,6 +61,15 @@ def mock_creative_engine():
     return mock
 
 
+@pytest.fixture(autouse=True)
+def isolated_chat_model_prefs(tmp_path: Path, monkeypatch):
+    """Keep inpaint_product's persisted chat-model preference out of the real home."""
+    from cm_agents.services import inpainting_compositor as ic
+
+    monkeypatch.setattr(ic, "CHAT_MODEL_PREFS_PATH", tmp_path / "prefs" / "inpaint_model.json")
+    monkeypatch.setattr(ic, "_chat_model_prefs", None)
+
+
 @pytest.fixture
 def mock_generator():
     """Mock Generator for batch parallel testing."""
@@ -103,6 +112,10 @@ class TestCampaignPipelineIntegration:
 
     def test_pipeline_initializes_both_agents(self):
         """CampaignPipeline should initialize CreativeEngine and Generator."""
+        # Import before patching: a first import under the patches would bind the
+        # mocks into cm_agents.pipeline for every later test.
+        from cm_agents.pipeline import CampaignPipeline
+
         with patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test", "OPENAI_API_KEY": "test"}):
             # Mock the actual agent classes where they're imported
             with patch("cm_agents.agents.creative_engine.CreativeEngine") as mock_ce:
@@ -112,8 +125,6 @@ class TestCampaignPipelineIntegration:
                     mock_gen.return_value.name = "Generator"
                     mock_gen.return_value.description = "Mocked"
 
-                    from cm_agents.pipeline import CampaignPipeline
-
                     pipeline = CampaignPipeline()
 
                     assert pipeline.creative_engine is not None
@@ -249,6 +260,64 @@ class TestCampaignPipelineBatch:
                 # 3-day campaign should produce 3 images
                 assert len(results) == 3
 
+    def test_inpainting_anchor_first_then_batch(
+        self,
+        sample_campaign_plan_3_days,
+        brands_dir: Path,
+        mock_creative_engine,
+        tmp_path: Path,
+    ):
+        """With cascade, image 1 runs alone to set the anchor; the rest go in one batch."""
+        batches: list[list[str]] = []
+
+        def fake_batch(jobs, max_concurrent=5):
+            batches.append([job["output_path"].name for job in jobs])
+            return [
+                (None, 0.0, "upstream error")
+                if job["output_path"].name.endswith("_v2.png")
+                else (job["output_path"], 0.12, None)
+                for job in jobs
+            ]
+
+        inpainter = MagicMock()
+        inpainter.generate_with_inpainting_batch = MagicMock(side_effect=fake_batch)
+        cascade = MagicMock()
+        cascade.prepare_cascaded_generation = MagicMock(side_effect=lambda p, **kw: (p, []))
+
+        from cm_agents.pipeline import CampaignPipeline
+
+        with (
+            patch.object(CampaignPipeline, "__init__", lambda self, **kwargs: None),
+            patch(
+                "cm_agents.services.inpainting_compositor.get_inpainting_compositor",
+                return_value=inpainter,
+            ),
+            patch(
+                "cm_agents.services.inpainting_compositor.get_cascade_manager",
+                return_value=cascade,
+            ),
+        ):
+            pipeline = CampaignPipeline()
+            pipeline.creative_engine = mock_creative_engine
+            pipeline.generator = MagicMock(model="gpt-image-1.5")
+
+            photo = tmp_path / "photo.png"
+            photo.write_bytes(b"\x89PNG\r\n\x1a\n")
+            output_dir = tmp_path / "output"
+            output_dir.mkdir()
+
+            results = pipeline.run_with_inpainting(
+                campaign_plan=sample_campaign_plan_3_days,
+                brand_dir=brands_dir / "test-brand",
+                product_photos={"test-product": photo},
+                output_dir=output_dir,
+            )
+
+        assert batches == [["test-product_v1.png"], ["test-product_v2.png", "test-product_v3.png"]]
+        cascade.set_anchor.assert_called_once_with(output_dir / "test-product_v1.png")
+        assert [r.variant_number for r in results] == [1, 3]
+        assert sum(r.cost_usd for r in results) == pytest.approx(0.24)
+
 
 class TestCampaignPipelineCostTracking:
     """Tests for cost estimation and tracking."""
@@ -474,3 +543,507 @@ class TestGeneratorBatchParallel:
                     )
 
                     assert isinstance(results, list)
+
+
+class TestCascadeStyleTokens:
+    """Style tokens extracted from the cascade anchor image."""
+
+    def test_tokens_from_flat_anchor(self):
+        """A flat dark red image yields its exact mean color."""
+        from PIL import Image
+
+        from cm_agents.services.inpainting_compositor import CascadeStyleManager
+
+        manager = CascadeStyleManager()
+        manager.set_anchor(Image.new("RGB", (1024, 1536), (120, 20, 20)))
+
+        assert manager.extracted_tokens == {
+            "avg_r": 120,
+            "avg_g": 20,
+            "avg_b": 20,
+            "luminance": "dark",
+            "contrast": "low",
+            "saturation": "vivid",
+        }
+
+    def test_contrast_from_split_anchor(self):
+        """Half black / half white is high contrast, flat gray is low."""
+        from PIL import Image
+
+        from cm_agents.services.inpainting_compositor import CascadeStyleManager
+
+        split = Image.new("RGB", (800, 600), (0, 0, 0))
+        split.paste((255, 255, 255), (400, 0, 800, 600))
+        manager = CascadeStyleManager()
+        manager.set_anchor(split)
+        assert manager.extracted_tokens["contrast"] == "high"
+
+        manager.set_anchor(Image.new("RGB", (800, 600), (128, 128, 128)))
+        assert manager.extracted_tokens["contrast"] == "low"
+
+    def test_same_anchor_file_is_not_reanalyzed(self, tmp_path: Path):
+        """Re-setting an unchanged anchor file skips token extraction."""
+        from PIL import Image
+
+        from cm_agents.services.inpainting_compositor import CascadeStyleManager
+
+        anchor = tmp_path / "anchor.png"
+        Image.new("RGB", (64, 64), (200, 200, 200)).save(anchor)
+        manager = CascadeStyleManager()
+        manager.set_anchor(anchor)
+
+        with patch.object(manager, "_extract_style_tokens") as extract:
+            manager.set_anchor(anchor)
+            extract.assert_not_called()
+
+            Image.new("RGB", (32, 32), (10, 10, 10)).save(anchor)
+            manager.set_anchor(anchor)
+            extract.assert_called_once()
+
+
+class TestInpaintingCache:
+    """Opt-in disk cache for generate_with_inpainting results."""
+
+    def test_second_identical_request_is_served_from_cache(self, tmp_path: Path, monkeypatch):
+        """Same photo + params hits the cache: no API calls and zero cost."""
+        from PIL import Image
+
+        from cm_agents.services import inpainting_compositor as ic
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("CM_INPAINT_CACHE", "1")
+        monkeypatch.setattr(ic, "INPAINT_CACHE_DIR", tmp_path / "cache")
+
+        compositor = ic.InpaintingCompositor()
+        scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+        compositor.generate_scene_with_placeholder = MagicMock(return_value=(scene, scene))
+        compositor.inpaint_product = MagicMock(return_value=scene.convert("RGB"))
+
+        photo = tmp_path / "photo.png"
+        scene.save(photo)
+        (tmp_path / "out").mkdir()
+        kwargs = {
+            "scene_prompt": "a  wooden table,\nsoft light",
+            "product_photo": photo,
+            "product_description": "bottle",
+        }
+
+        _, first_cost = compositor.generate_with_inpainting(
+            output_path=tmp_path / "out" / "a.png", **kwargs
+        )
+        kwargs["scene_prompt"] = "a wooden table, soft light"
+        path, second_cost = compositor.generate_with_inpainting(
+            output_path=tmp_path / "out" / "b.png", **kwargs
+        )
+
+        assert first_cost > 0
+        assert second_cost == 0.0
+        assert path.read_bytes() == (tmp_path / "out" / "a.png").read_bytes()
+        assert compositor.inpaint_product.call_count == 1
+
+    def test_fallback_results_are_not_cached(self, tmp_path: Path, monkeypatch):
+        """A degraded _fallback_inpaint result must not pin the cache entry."""
+        from PIL import Image
+
+        from cm_agents.services import inpainting_compositor as ic
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("CM_INPAINT_CACHE", "1")
+        monkeypatch.setattr(ic, "INPAINT_CACHE_DIR", tmp_path / "cache")
+
+        compositor = ic.InpaintingCompositor()
+        scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+        fallback = scene.convert("RGB")
+        fallback.info[ic.FALLBACK_INFO_KEY] = True
+        compositor.generate_scene_with_placeholder = MagicMock(return_value=(scene, scene))
+        compositor.inpaint_product = MagicMock(return_value=fallback)
+
+        photo = tmp_path / "photo.png"
+        scene.save(photo)
+        kwargs = {"scene_prompt": "table", "product_photo": photo, "product_description": "x"}
+
+        compositor.generate_with_inpainting(output_path=tmp_path / "out" / "a.png", **kwargs)
+        _, cost = compositor.generate_with_inpainting(
+            output_path=tmp_path / "out" / "b.png", **kwargs
+        )
+
+        assert cost > 0
+        assert compositor.inpaint_product.call_count == 2
+        assert not list((tmp_path / "cache").glob("*.png"))
+
+
+class TestIntermediateScene:
+    """Debug-only `_scene_*.png` writes in generate_with_inpainting."""
+
+    def _run(self, tmp_path: Path, monkeypatch) -> Path:
+        from concurrent.futures import Future
+
+        from PIL import Image
+
+        from cm_agents.services import inpainting_compositor as ic
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+        class _InlineWriter:
+            def submit(self, fn, *args, **kwargs):
+                future = Future()
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+                return future
+
+        monkeypatch.setattr(ic, "_debug_writer", _InlineWriter)
+
+        compositor = ic.InpaintingCompositor()
+        scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+        compositor.generate_scene_with_placeholder = MagicMock(return_value=(scene, scene))
+        compositor.inpaint_product = MagicMock(return_value=scene.convert("RGB"))
+
+        output = tmp_path / "out" / "day1.png"
+        compositor.generate_with_inpainting(
+            scene_prompt="table",
+            product_photo=tmp_path / "photo.png",
+            product_description="bottle",
+            output_path=output,
+        )
+        return output.parent / "_scene_day1.png"
+
+    def test_scene_not_saved_by_default(self, tmp_path: Path, monkeypatch):
+        monkeypatch.delenv("CM_SAVE_INTERMEDIATE", raising=False)
+        assert not self._run(tmp_path, monkeypatch).exists()
+
+    def test_scene_saved_when_enabled(self, tmp_path: Path, monkeypatch):
+        monkeypatch.setenv("CM_SAVE_INTERMEDIATE", "1")
+        assert self._run(tmp_path, monkeypatch).exists()
+
+    def test_failed_scene_save_is_logged(self, tmp_path: Path, monkeypatch, caplog):
+        monkeypatch.setenv("CM_SAVE_INTERMEDIATE", "1")
+        (tmp_path / "out" / "_scene_day1.png").mkdir(parents=True)  # save() cannot write here
+
+        with caplog.at_level("WARNING", logger="cm_agents.services.inpainting_compositor"):
+            self._run(tmp_path, monkeypatch)
+
+        assert "No se pudo guardar la imagen intermedia" in caplog.text
+
+
+class TestProductMask:
+    """create_product_mask output format."""
+
+    @pytest.mark.parametrize("shape", ["ellipse", "rectangle", "bottle"])
+    def test_mask_is_rgba_white_shape_on_black(self, shape: str, monkeypatch):
+        from cm_agents.services.inpainting_compositor import InpaintingCompositor
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        mask = InpaintingCompositor().create_product_mask((400, 600), shape=shape)
+
+        assert mask.mode == "RGBA"
+        assert mask.getpixel((200, 300)) == (255, 255, 255, 255)
+        assert mask.getpixel((5, 5)) == (0, 0, 0, 255)
+
+    def test_feather_softens_the_edit_area_edge(self, monkeypatch):
+        from cm_agents.services.inpainting_compositor import InpaintingCompositor
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        compositor = InpaintingCompositor()
+        hard = compositor.create_product_mask((400, 600), feather=0)
+        soft = compositor.create_product_mask((400, 600), feather=20)
+
+        assert [i for i, n in enumerate(hard.getchannel("R").histogram()) if n] == [0, 255]
+        assert sum(1 for n in soft.getchannel("R").histogram() if n) > 2
+        assert soft.getchannel("A").getextrema() == (255, 255)
+
+    def test_mask_is_cached_but_returned_as_a_copy(self, monkeypatch):
+        from cm_agents.services.inpainting_compositor import InpaintingCompositor
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        compositor = InpaintingCompositor()
+        first = compositor.create_product_mask((400, 600), shape="rectangle")
+        first.putpixel((200, 300), (0, 0, 0, 0))
+
+        second = compositor.create_product_mask((400, 600), shape="rectangle")
+
+        assert second is not first
+        assert second.getpixel((200, 300)) == (255, 255, 255, 255)
+
+
+class TestInpaintFileUpload:
+    """CM_INPAINT_FILE_UPLOAD: images referenced by file_id instead of inline base64."""
+
+    def test_images_uploaded_once_and_referenced_by_file_id(self, tmp_path: Path, monkeypatch):
+        import base64
+        from collections import OrderedDict
+
+        from PIL import Image
+
+        from cm_agents.services import inpainting_compositor as ic
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("CM_INPAINT_FILE_UPLOAD", "1")
+        monkeypatch.delenv("CM_SPECULATIVE_INPAINT", raising=False)
+        monkeypatch.setattr(ic, "_uploaded_files", OrderedDict())
+
+        scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+        photo = tmp_path / "photo.png"
+        scene.save(photo)
+        result_b64 = base64.b64encode(photo.read_bytes()).decode()
+
+        compositor = ic.InpaintingCompositor()
+        compositor.client = MagicMock()
+        compositor.client.files.create.side_effect = lambda **kw: MagicMock(
+            id=f"file-{kw['file'][0]}"
+        )
+        compositor.client.responses.create.return_value = MagicMock(
+            output=[MagicMock(type="image_generation_call", result=result_b64)]
+        )
+        mask = compositor.create_product_mask(scene.size)
+
+        for _ in range(2):
+            compositor.inpaint_product(scene, mask, photo, "bottle")
+
+        assert compositor.client.files.create.call_count == 3
+        kwargs = compositor.client.responses.create.call_args.kwargs
+        images = [p for p in kwargs["input"][0]["content"] if p["type"] == "input_image"]
+        assert [p.get("file_id") for p in images] == ["file-scene.png", "file-photo.png"]
+        assert kwargs["tools"][0]["input_image_mask"] == {"file_id": "file-mask.png"}
+
+
+@pytest.mark.parametrize(
+    ("scene_size", "expected"),
+    [
+        ((1024, 1536), "1024x1536"),
+        ((1080, 1920), "1024x1536"),
+        ((1024, 1024), "1024x1024"),
+        ((1536, 1024), "1536x1024"),
+        ((1920, 1080), "1536x1024"),
+    ],
+)
+def test_inpaint_api_size_follows_scene_aspect(scene_size: tuple[int, int], expected: str):
+    """Landscape scenes map to the landscape API size instead of a square one."""
+    from cm_agents.services.inpainting_compositor import _api_size
+
+    assert _api_size(*scene_size) == expected
+
+
+def test_oversized_product_reference_is_downsized(tmp_path: Path, monkeypatch):
+    """Product photos over the upload limit are sent as a reduced JPEG."""
+    import base64
+
+    from PIL import Image
+
+    from cm_agents.services import inpainting_compositor as ic
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("CM_INPAINT_FILE_UPLOAD", raising=False)
+    monkeypatch.delenv("CM_SPECULATIVE_INPAINT", raising=False)
+    monkeypatch.setattr(ic, "MAX_UPLOAD_BYTES", 1000)
+
+    photo = tmp_path / "phone.png"
+    Image.effect_noise((2400, 200), 60).save(photo)
+    scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+    result = tmp_path / "result.png"
+    scene.save(result)
+
+    compositor = ic.InpaintingCompositor()
+    compositor.client = MagicMock()
+    compositor.client.responses.create.return_value = MagicMock(
+        output=[
+            MagicMock(
+                type="image_generation_call",
+                result=base64.b64encode(result.read_bytes()).decode(),
+            )
+        ]
+    )
+    compositor.inpaint_product(scene, compositor.create_product_mask(scene.size), photo, "bottle")
+
+    content = compositor.client.responses.create.call_args.kwargs["input"][0]["content"]
+    product_url = [p for p in content if p["type"] == "input_image"][1]["image_url"]
+    assert product_url.startswith("data:image/jpeg;base64,")
+
+
+def test_heavy_product_png_within_max_edge_is_reencoded(tmp_path: Path, monkeypatch):
+    """A product PNG over the upload limit is re-encoded even if no edge exceeds 2048."""
+    import base64
+    import os
+
+    from PIL import Image
+
+    from cm_agents.services import inpainting_compositor as ic
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("CM_INPAINT_FILE_UPLOAD", raising=False)
+    monkeypatch.delenv("CM_SPECULATIVE_INPAINT", raising=False)
+
+    photo = tmp_path / "phone.png"
+    Image.frombytes("RGB", (1600, 1200), os.urandom(1600 * 1200 * 3)).save(photo)
+    assert photo.stat().st_size > ic.MAX_UPLOAD_BYTES
+    scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+    result = tmp_path / "result.png"
+    scene.save(result)
+
+    compositor = ic.InpaintingCompositor()
+    compositor.client = MagicMock()
+    compositor.client.responses.create.return_value = MagicMock(
+        output=[
+            MagicMock(
+                type="image_generation_call",
+                result=base64.b64encode(result.read_bytes()).decode(),
+            )
+        ]
+    )
+    compositor.inpaint_product(scene, compositor.create_product_mask(scene.size), photo, "bottle")
+
+    content = compositor.client.responses.create.call_args.kwargs["input"][0]["content"]
+    product_url = [p for p in content if p["type"] == "input_image"][1]["image_url"]
+    header, _, payload = product_url.partition(",")
+    assert header == "data:image/jpeg;base64"
+    assert len(base64.b64decode(payload)) <= ic.MAX_UPLOAD_BYTES
+
+
+def test_inpaint_starts_with_last_working_chat_model(tmp_path: Path, monkeypatch):
+    """A model that answered 403 is not probed again once another one worked."""
+    import base64
+
+    from PIL import Image
+
+    from cm_agents.services import inpainting_compositor as ic
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("CM_SPECULATIVE_INPAINT", raising=False)
+    monkeypatch.delenv("CM_INPAINT_FILE_UPLOAD", raising=False)
+
+    scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+    photo = tmp_path / "photo.png"
+    scene.save(photo)
+    response = MagicMock(
+        output=[
+            MagicMock(
+                type="image_generation_call",
+                result=base64.b64encode(photo.read_bytes()).decode(),
+            )
+        ]
+    )
+
+    def create(model: str, **kwargs):
+        if model == "gpt-4o-mini":
+            raise RuntimeError("Error code: 403 - model not available")
+        return response
+
+    compositor = ic.InpaintingCompositor()
+    compositor.client = MagicMock()
+    compositor.client.responses.create.side_effect = create
+    mask = compositor.create_product_mask(scene.size)
+
+    compositor.inpaint_product(scene, mask, photo, "bottle")
+    assert ic.CHAT_MODEL_PREFS_PATH.exists()
+
+    monkeypatch.setattr(ic, "_chat_model_prefs", None)  # fresh process: read from disk
+    compositor.client.responses.create.reset_mock()
+    compositor.inpaint_product(scene, mask, photo, "bottle")
+
+    models = [c.kwargs["model"] for c in compositor.client.responses.create.call_args_list]
+    assert models == ["gpt-4-turbo"]
+
+
+def test_speculative_inpaint_remembers_only_the_winning_model(tmp_path: Path, monkeypatch):
+    """Slower speculative requests that finish later do not overwrite the preference."""
+    import base64
+    import threading
+    import time
+
+    from PIL import Image
+
+    from cm_agents.services import inpainting_compositor as ic
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("CM_SPECULATIVE_INPAINT", "1")
+    monkeypatch.delenv("CM_INPAINT_FILE_UPLOAD", raising=False)
+
+    scene = Image.new("RGBA", (32, 48), (10, 20, 30, 255))
+    photo = tmp_path / "photo.png"
+    scene.save(photo)
+    response = MagicMock(
+        output=[
+            MagicMock(
+                type="image_generation_call",
+                result=base64.b64encode(photo.read_bytes()).decode(),
+            )
+        ]
+    )
+    all_started = threading.Barrier(3)
+    release = threading.Event()
+    losers_done = threading.Semaphore(0)
+
+    def create(model: str, **kwargs):
+        all_started.wait(5)
+        if model == "gpt-4o-mini":
+            return response
+        release.wait(5)
+        losers_done.release()
+        return response
+
+    compositor = ic.InpaintingCompositor()
+    compositor.client = MagicMock()
+    compositor.client.responses.create.side_effect = create
+
+    compositor.inpaint_product(scene, compositor.create_product_mask(scene.size), photo, "bottle")
+    release.set()
+    for _ in range(2):
+        assert losers_done.acquire(timeout=5)
+    time.sleep(0.05)  # let the losing futures finish after create() returns
+
+    assert ic._preferred_chat_model() == "gpt-4o-mini"
+
+
+def test_undecodable_style_reference_is_sent_unreduced(tmp_path: Path):
+    """A style ref PIL cannot open falls back to its raw bytes instead of failing the run."""
+    import base64
+
+    from cm_agents.services.direct_generator import _style_ref_data_url
+
+    ref = tmp_path / "ref.png"
+    ref.write_bytes(b"not really a png")
+
+    assert _style_ref_data_url(ref) == (
+        f"data:image/png;base64,{base64.b64encode(ref.read_bytes()).decode()}"
+    )
+    assert _style_ref_data_url(tmp_path / "missing.png") is None
+
+
+def test_undecodable_font_reference_does_not_abort_text_overlay(tmp_path: Path, monkeypatch):
+    """The font ref goes through the same raw-bytes fallback as style refs."""
+    import base64
+
+    from PIL import Image
+
+    from cm_agents.models.product import Product
+    from cm_agents.services.direct_generator import DirectGenerator
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    base = tmp_path / "base.png"
+    Image.new("RGB", (16, 16), "white").save(base)
+    font_ref = tmp_path / "fuente.png"
+    font_ref.write_bytes(b"not really a png")
+
+    generator = DirectGenerator()
+    generator.client = MagicMock()
+    generator.client.responses.create.return_value = MagicMock(
+        output=[
+            MagicMock(
+                type="image_generation_call",
+                result=base64.b64encode(base.read_bytes()).decode(),
+            )
+        ]
+    )
+    generator.add_text_overlay(
+        base_image=base,
+        style_guide=MagicMock(),
+        product=Product(name="Test", price="$1", category="test"),
+        headline="OFERTA",
+        output_path=tmp_path / "final.png",
+        font_ref=font_ref,
+    )
+
+    content = generator.client.responses.create.call_args.kwargs["input"][0]["content"]
+    images = [p["image_url"] for p in content if p["type"] == "input_image"]
+    assert images[0] == f"data:image/png;base64,{base64.b64encode(font_ref.read_bytes()).decode()}"
@@ -12,7 +12,7 @@ from typing import Any
 import pytest
 from PIL import Image
 
-from cm_agents.services.agent_campaign import OrchestratorCampaignService
+from cm_agents.services.agent_campaign import OrchestratorCampaignService, _extract_json
 
 
 BRAND_JSON = {
@@ -260,6 +260,9 @@ def test_orchestrator_build_full(
     assert len(artifacts["generation"]) > 0
     assert all("image_path" in g for g in artifacts["generation"])
     assert all(g["cost_usd"] > 0 for g in artifacts["generation"] if "cost_usd" in g)
+    # Items are generated concurrently: each one must own its output file.
+    image_paths = [g["image_path"] for g in artifacts["generation"]]
+    assert len(set(image_paths)) == len(image_paths)
 
     assert (result["run_dir"] / "report.md").exists()
 
@@ -440,8 +443,160 @@ def test_orchestrator_artifacts_complete(
     assert artifacts_file.exists()
     assert report_file.exists()
 
+    trace_lines = (run_dir / artifacts["orchestration_trace_file"]).read_text(encoding="utf-8")
+    trace_entries = [json.loads(line) for line in trace_lines.splitlines()]
+    assert len(trace_entries) == artifacts["orchestration_trace_count"]
+    assert (
+        trace_entries[-len(artifacts["orchestration_trace"]) :] == artifacts["orchestration_trace"]
+    )
+
     report_text = report_file.read_text(encoding="utf-8")
     assert "test-brand" in report_text
     assert "Trend Brief" in report_text
     assert "Items" in report_text
     assert "Generated outputs" in report_text
+
+
+def test_orchestrator_retries_items_that_fail_qa(
+    orchestrator_env: Path,
+    mock_anthropic_creative: list[dict[str, Any]],
+    mock_openai_responses: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Items rejected by QA are regenerated in the next round."""
+    import time
+
+    service = OrchestratorCampaignService(knowledge_dir=Path("knowledge"))
+    # _retry_delay is a classmethod: the backoff has to be patched on the class.
+    monkeypatch.setattr(OrchestratorCampaignService, "RETRY_BACKOFF_BASE", 0.0)
+    real_sleep = time.sleep
+    sleeps: list[float] = []
+
+    def recording_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        real_sleep(seconds)
+
+    monkeypatch.setattr(time, "sleep", recording_sleep)
+    original_run = service.qa.run
+    calls = {"n": 0}
+
+    def flaky_qa(image_path: Path | None, error: str | None = None) -> dict[str, Any]:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return {"ok": False, "reason": "suspicious_small_image", "details": "forced"}
+        return original_run(image_path, error=error)
+
+    monkeypatch.setattr(service.qa, "run", flaky_qa)
+
+    result = service.run(
+        brand_slug="test-brand",
+        product_slugs=None,
+        objective="campana de otoño",
+        days=1,
+        build=True,
+        include_text=True,
+        max_retries=1,
+        require_llm_orchestrator=False,
+    )
+    artifacts = result["artifacts"]
+
+    generated = [g for g in artifacts["generation"] if "image_path" in g]
+    assert len(generated) == 1
+    assert generated[0]["attempt"] == 2
+
+    steps = [t["step"] for t in artifacts["orchestration_trace"]]
+    assert steps.count("generate_item") == 2
+    assert steps.count("qa_check") == 2
+    assert sleeps == [0.0]
+
+
+def test_trace_is_flushed_when_the_run_fails(
+    orchestrator_env: Path,
+    mock_anthropic_creative: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Buffered trace entries reach trace.jsonl even if a worker raises."""
+    service = OrchestratorCampaignService(knowledge_dir=Path("knowledge"))
+
+    def broken_design(*args: Any, **kwargs: Any) -> Any:
+        raise RuntimeError("design exploded")
+
+    monkeypatch.setattr(service.design, "run", broken_design)
+
+    with pytest.raises(RuntimeError, match="design exploded"):
+        service.run(
+            brand_slug="test-brand",
+            product_slugs=None,
+            objective="campana de otoño",
+            days=1,
+            build=True,
+            include_text=True,
+            require_llm_orchestrator=False,
+        )
+
+    (trace_file,) = (orchestrator_env / "outputs" / "agent_runs").glob("*/trace.jsonl")
+    steps = [
+        json.loads(line)["step"] for line in trace_file.read_text(encoding="utf-8").splitlines()
+    ]
+    assert steps[0] == "orchestration_decision"
+
+
+def test_run_from_user_input_records_translation(
+    orchestrator_env: Path,
+    mock_anthropic_creative: list[dict[str, Any]],
+    mock_openai_responses: list[dict[str, Any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """The input translation lands in the single artifacts.json write."""
+    service = OrchestratorCampaignService(knowledge_dir=Path("knowledge"))
+    # No strategist LLM: translation and worker plan use the local fallbacks.
+    monkeypatch.setattr(service, "_client", lambda: None)
+    discover = OrchestratorCampaignService._discover_products_with_photos
+    scans: list[str] = []
+
+    def counting_discover(brand_slug: str) -> list[str]:
+        scans.append(brand_slug)
+        return discover(brand_slug)
+
+    monkeypatch.setattr(service, "_discover_products_with_photos", counting_discover)
+
+    result = service.run_from_user_input(
+        brand_slug="test-brand",
+        user_request="campaña de 1 día para otoño",
+        require_llm_orchestrator=False,
+    )
+
+    on_disk = json.loads((result["run_dir"] / "artifacts.json").read_text(encoding="utf-8"))
+    assert "input_translation" in result["artifacts"]
+    assert on_disk["input_translation"] == result["artifacts"]["input_translation"]
+    # "All products" is resolved once, inside run(); the request itself stays as given.
+    assert scans == ["test-brand"]
+    assert on_disk["input"]["products"] == ["demo-product"]
+    assert on_disk["input_translation"]["products"] == []
+
+
+def test_discover_products_follows_symlinked_product_dirs(orchestrator_env: Path) -> None:
+    """Product folders symlinked into the brand are discovered like real ones."""
+    products_dir = orchestrator_env / "brands" / "test-brand" / "products"
+    shared = orchestrator_env / "shared" / "demo-product"
+    shared.parent.mkdir()
+    (products_dir / "demo-product").rename(shared)
+    (products_dir / "demo-product").symlink_to(shared, target_is_directory=True)
+
+    assert OrchestratorCampaignService._discover_products_with_photos("test-brand") == [
+        "demo-product"
+    ]
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('{"days": 3}', {"days": 3}),
+        ('Plan:\n```json\n{"a": {"b": 1}}\n```\nListo {fin}', {"a": {"b": 1}}),
+        ('{roto {"ok": true}', {"ok": True}),
+        ("sin json", None),
+    ],
+)
+def test_extract_json_from_llm_text(text: str, expected: dict[str, Any] | None) -> None:
+    """The first well-formed JSON object is recovered from surrounding prose."""
+    assert _extract_json(text) == expected
@@ -155,6 +155,93 @@ class TestAgentCallSequence:
         assert "generator" in call_sequence
 
 
+class TestPipelineRunBatch:
+    """Test batched generation over several items."""
+
+    def test_run_batch_keeps_order_and_isolates_failures(self, tmp_path: Path):
+        """Results line up with entries and one failing item doesn't abort the batch."""
+        from cm_agents.pipeline import GenerationPipeline
+
+        def fake_run(self, reference_path, brand_dir, product_dir, **kwargs):
+            if product_dir.name == "broken":
+                raise RuntimeError("upstream error")
+            return [product_dir.name]
+
+        with patch.dict(
+            "os.environ", {"ANTHROPIC_API_KEY": "test-key", "OPENAI_API_KEY": "test-key"}
+        ):
+            pipeline = GenerationPipeline(generator_model="gpt-image-1.5")
+
+        with patch.object(GenerationPipeline, "run", fake_run):
+            outcomes = pipeline.run_batch(
+                reference_path=tmp_path / "ref.jpg",
+                brand_dir=tmp_path,
+                entries=[
+                    {"product_dir": tmp_path / "a"},
+                    {"product_dir": tmp_path / "broken"},
+                    {"product_dir": tmp_path / "c"},
+                ],
+                max_concurrent=2,
+            )
+
+        assert outcomes == [(["a"], None), ([], "upstream error"), (["c"], None)]
+
+    def test_run_batch_retries_transient_errors_once(self, tmp_path: Path):
+        """Timeouts are retried in place; other errors are reported as-is."""
+        import httpx
+
+        from cm_agents.pipeline import GenerationPipeline
+
+        calls: dict[str, int] = {}
+
+        def fake_run(self, reference_path, brand_dir, product_dir, **kwargs):
+            calls[product_dir.name] = calls.get(product_dir.name, 0) + 1
+            if product_dir.name == "flaky" and calls["flaky"] == 1:
+                raise httpx.ConnectTimeout("timed out")
+            if product_dir.name == "down":
+                raise httpx.ConnectTimeout("still down")
+            return [product_dir.name]
+
+        with patch.dict(
+            "os.environ", {"ANTHROPIC_API_KEY": "test-key", "OPENAI_API_KEY": "test-key"}
+        ):
+            pipeline = GenerationPipeline(generator_model="gpt-image-1.5")
+
+        with patch.object(GenerationPipeline, "run", fake_run):
+            outcomes = pipeline.run_batch(
+                reference_path=tmp_path / "ref.jpg",
+                brand_dir=tmp_path,
+                entries=[{"product_dir": tmp_path / "flaky"}, {"product_dir": tmp_path / "down"}],
+            )
+
+        assert outcomes == [(["flaky"], None), ([], "still down")]
+        assert calls == {"flaky": 2, "down": 2}
+
+    def test_map_bounded_keeps_order_and_caps_concurrency(self):
+        """map_bounded returns results in input order with at most max_concurrent in flight."""
+        import threading
+        import time
+
+        from cm_agents.services.concurrency import map_bounded
+
+        lock = threading.Lock()
+        running = peak = 0
+
+        def work(n: int) -> int:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01 * (5 - n))
+            with lock:
+                running -= 1
+            return n * 10
+
+        assert map_bounded(work, [1, 2, 3, 4], max_concurrent=2) == [10, 20, 30, 40]
+        assert peak <= 2
+        assert map_bounded(work, [], max_concurrent=2) == []
+
+
 class TestWebSocketChatFlow:
     """Test WebSocket chat triggers agents correctly."""
 
@@ -241,3 +328,30 @@ class TestAgentObservability:
                 # Verify no errors during init
                 errors = [r for r in caplog.records if r.levelno >= logging.ERROR]  # noqa: F841
                 # Some warnings are OK (missing files, etc)
+
+
+class TestVariantStrategy:
+    """Prompt variations used by GenerationPipeline.run for multiple variants."""
+
+    def test_diverse_variants_are_unique_and_leave_global_random_alone(self):
+        import random
+
+        from cm_agents.models.generation import GenerationParams, GenerationPrompt
+        from cm_agents.services.variant_generator import VariantStrategy
+
+        base = GenerationPrompt(
+            prompt="base",
+            visual_description="",
+            negative_prompt="",
+            params=GenerationParams(aspect_ratio="4:5", quality="high", size="1080x1350"),
+        )
+        random.seed(42)
+        expected_next = random.random()
+        random.seed(42)
+
+        variants = VariantStrategy.create_diverse_variants(base, 10)
+
+        assert random.random() == expected_next
+        assert len({prompt.prompt for prompt, _ in variants}) == 10
+        assert [kind for _, kind in variants] == [f"variant_{i}" for i in range(1, 11)]
+        assert variants == VariantStrategy.create_diverse_variants(base, 10)
@@ -0,0 +1,34 @@
+"""Tests for the knowledge-base style registry."""
+
+import json
+import os
+from pathlib import Path
+
+from cm_agents.styles import get_available_style_keys, load_styles
+
+
+def _write_styles(path: Path, keys: list[str], mtime_ns: int) -> None:
+    styles = {key: {"name": key.title(), "description": ""} for key in keys}
+    path.write_text(json.dumps({"styles": styles}), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_styles_are_reloaded_when_the_knowledge_file_changes(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_DIR", str(tmp_path))
+    kb = tmp_path / "design_2026.json"
+
+    _write_styles(kb, ["minimal_clean", "bold"], mtime_ns=1_000_000_000)
+    assert get_available_style_keys() == ["bold", "minimal_clean"]
+
+    load_styles().clear()  # callers get a copy; the cached registry is untouched
+    assert set(load_styles()) == {"bold", "minimal_clean"}
+
+    _write_styles(kb, ["retro"], mtime_ns=2_000_000_000)
+    assert get_available_style_keys() == ["retro"]
+    assert load_styles()["retro"].name == "Retro"
+
+
+def test_missing_knowledge_file_has_no_styles(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_DIR", str(tmp_path / "missing"))
+    assert load_styles() == {}
+    assert get_available_style_keys() == []